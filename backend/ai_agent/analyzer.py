@@ -1,35 +1,184 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 import os
 from dotenv import load_dotenv
 import json
 import aiohttp
 import asyncio
+from services.completion_cache import CompletionCache, completion_key
+from services.executor import gather_bounded
+from services.rate_limit import (
+    RETRYABLE_STATUSES,
+    RetryableStatus,
+    UpstreamLimiter,
+    get_limiter,
+    parse_retry_after
+)
+from services.single_flight import SingleFlight
 
 load_dotenv()
 
-class AIWorkforceAnalyzer:
+OPENAI_API_URL = os.getenv("OPENAI_API_URL", "https://api.openai.com/v1/chat/completions")
+OPENAI_CONNECTOR_LIMIT = int(os.getenv("OPENAI_CONNECTOR_LIMIT", "20"))
+OPENAI_KEEPALIVE_TIMEOUT = float(os.getenv("OPENAI_KEEPALIVE_TIMEOUT", "60"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+# Teams whose member details exceed this many prompt tokens are analysed map-reduce
+ANALYSIS_TOKEN_BUDGET = int(os.getenv("ANALYSIS_TOKEN_BUDGET", "3000"))
+ANALYSIS_MAP_CONCURRENCY = int(os.getenv("ANALYSIS_MAP_CONCURRENCY", "4"))
+CHARS_PER_TOKEN = 4  # Rough estimate for English text
+ROLE_CONTEXT_CHARS = int(os.getenv("ROLE_CONTEXT_CHARS", "2000"))
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+# Top-level sections of the analysis and their keys in the result
+SECTION_KEYS = {
+    "Impact Summary": "impact_summary",
+    "Recommendations": "recommendations",
+    "Risk Assessment": "risk_assessment",
+    "Upskilling Opportunities": "upskilling_opportunities"
+}
+
+class AnalysisUnavailable(Exception):
+    """No real completion could be obtained; fallback is the placeholder analysis to show instead"""
+
+    def __init__(self, fallback: str):
+        super().__init__("Analysis unavailable")
+        self.fallback = fallback
+
+class StreamInterrupted(Exception):
+    """The completion stream failed after tokens were sent; not retried, to avoid repeating them"""
+
+_STREAM_END = object()
+
+class SectionParser:
+    """Incrementally parse the top-level members of a streamed JSON object.
+
+    feed() returns the (name, value) pairs completed by the new text, so a
+    section can be shown as soon as the model has finished writing it.
+    Text before the opening brace (such as a code fence) is skipped.
+    """
+
     def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+        self._finished = False
+        self.sections: Dict[str, Any] = {}
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing brace of the object has been seen"""
+        return self._finished
+
+    def feed(self, delta: str) -> List[Tuple[str, Any]]:
+        self._text += delta
+        sections = []
+        while self._pos < len(self._text) and not self._finished:
+            i = self._pos
+            c = self._text[i]
+            self._pos += 1
+            if self._member_start is None:
+                if c == "{":
+                    self._depth = 1
+                    self._member_start = i + 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    sections.extend(self._complete(i))
+                    self._finished = True
+            elif c == "," and self._depth == 1:
+                sections.extend(self._complete(i))
+                self._member_start = i + 1
+        return sections
+
+    def _complete(self, end: int) -> List[Tuple[str, Any]]:
+        member = self._text[self._member_start:end]
+        if not member.strip():
+            return []
+        try:
+            parsed = json.loads("{" + member + "}")
+        except json.JSONDecodeError:
+            return []
+        self.sections.update(parsed)
+        return list(parsed.items())
+
+class AIWorkforceAnalyzer:
+    def __init__(
+        self,
+        cache: Optional[CompletionCache] = None,
+        api_url: Optional[str] = None,
+        limiter: Optional[UpstreamLimiter] = None
+    ):
         self.api_key = os.getenv("OPENAI_API_KEY", "")
         self.model = "gpt-4"
         self.temperature = 0.7
-        self.api_url = "https://api.openai.com/v1/chat/completions"
+        self.api_url = api_url or OPENAI_API_URL
+        # Shared OpenAI rate limit, concurrency cap and retry policy
+        self.limiter = limiter or get_limiter("openai", rate_limit=1.0, burst=3, max_concurrency=4)
+        # One pooled session is shared by every completion request
+        self.timeout = aiohttp.ClientTimeout(total=OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Completions are cached by content and identical concurrent prompts share one request
+        self.cache = cache if cache is not None else CompletionCache()
+        self._inflight = SingleFlight()
+
+    async def start(self):
+        """Open the pooled HTTP session (called on app startup)"""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=OPENAI_CONNECTOR_LIMIT,
+            keepalive_timeout=OPENAI_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        """Close the pooled HTTP session (called on app shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Start lazily for callers outside the app lifecycle
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
         
-    async def analyze_team(self, request: Dict[str, Any]) -> Dict[str, Any]:
+    async def analyze_team(
+        self,
+        request: Dict[str, Any],
+        role_assessments: Optional[List[Tuple[str, Dict[str, Any]]]] = None
+    ) -> Dict[str, Any]:
         """
-        Analyze the impact of AI on a team and generate recommendations
+        Analyze the impact of AI on a team and generate recommendations.
+
+        With role_assessments, (label, assessment) pairs from assess_roles,
+        only the team-level synthesis is computed.
         """
-        # Format team information
-        team_info = self._format_team_info(request["members"])
-        
-        # Create prompt
-        prompt = self._create_prompt(
-            team_info=team_info,
-            industry=request["industry"],
-            company_size=request["company_size"]
-        )
-        
-        # Get analysis from OpenAI API
-        analysis = await self._get_ai_analysis(prompt)
+        try:
+            prompt = await self._analysis_prompt(request, role_assessments)
+        except AnalysisUnavailable as e:
+            # Every group failed, so there is nothing to merge
+            analysis = e.fallback
+        else:
+            # Get analysis from OpenAI API
+            analysis = await self._get_ai_analysis(prompt)
         
         # Process and structure the response
         result = self._process_response(analysis)
@@ -37,6 +186,295 @@ class AIWorkforceAnalyzer:
         
         return result
     
+    async def stream_team_analysis(
+        self,
+        request: Dict[str, Any],
+        role_assessments: Optional[List[Tuple[str, Dict[str, Any]]]] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Analyze a team while streaming the completion.
+
+        Yields ("delta", text) for every token delta, ("section", {"name", "value"})
+        as each top-level section completes, and finally ("result", analysis).
+        """
+        try:
+            prompt = await self._analysis_prompt(request, role_assessments)
+        except AnalysisUnavailable as e:
+            deltas = self._replay(e.fallback)
+        else:
+            deltas = self._stream_ai_analysis(prompt)
+        parser = SectionParser()
+        chunks = []
+        async for delta in deltas:
+            chunks.append(delta)
+            yield "delta", delta
+            for name, value in parser.feed(delta):
+                yield "section", {"name": SECTION_KEYS.get(name, name), "value": value}
+        
+        # Sections parsed along the way survive text around the JSON, such as code fences
+        if parser.finished:
+            result = self._structure_sections(parser.sections)
+        else:
+            result = self._process_response("".join(chunks))
+        result["team_name"] = request["team_name"]
+        yield "result", result
+    
+    async def assess_roles(
+        self,
+        roles: List[Dict[str, Any]],
+        industry: str,
+        company_size: str
+    ) -> List[Tuple[Dict[str, Any], bool]]:
+        """
+        Assess the impact of AI on each role, in parallel.
+
+        Returns (assessment, cacheable) per role; placeholder assessments
+        for failed calls are not cacheable.
+        """
+        prompts = [self._create_role_prompt(role, industry, company_size) for role in roles]
+        completions = await gather_bounded(
+            [self._complete(prompt) for prompt in prompts], ANALYSIS_MAP_CONCURRENCY
+        )
+        
+        assessments = []
+        for role, completion in zip(roles, completions):
+            if isinstance(completion, AnalysisUnavailable):
+                assessments.append((self._process_response(completion.fallback), False))
+            elif isinstance(completion, BaseException):
+                print(f"Error assessing role {role['role']}: {str(completion)}")
+                assessments.append((self._process_response(self._exception_response(completion)), False))
+            else:
+                assessments.append((self._process_response(completion), True))
+        return assessments
+    
+    async def _analysis_prompt(
+        self,
+        request: Dict[str, Any],
+        role_assessments: Optional[List[Tuple[str, Dict[str, Any]]]] = None
+    ) -> str:
+        """
+        Final analysis prompt for a team request.
+
+        Small teams get a single prompt with every member. Larger teams are
+        split into batches under the token budget that are analysed in
+        parallel (map); the prompt returned then merges their results (reduce).
+        Precomputed role assessments skip straight to the reduce step.
+        Raises AnalysisUnavailable if every group analysis fails.
+        """
+        if role_assessments:
+            return await self._reduce_prompt(role_assessments, request)
+        
+        members = request["members"]
+        # Format team information
+        team_info = self._format_team_info(members)
+        if estimate_tokens(team_info) <= ANALYSIS_TOKEN_BUDGET or len(members) < 2:
+            return self._create_prompt(
+                team_info=team_info,
+                industry=request["industry"],
+                company_size=request["company_size"]
+            )
+        
+        batches = self._batch_members(members, ANALYSIS_TOKEN_BUDGET)
+        prompts = [
+            self._create_batch_prompt(
+                team_info=self._format_team_info(batch),
+                group=self._group_label(batch),
+                industry=request["industry"],
+                company_size=request["company_size"]
+            )
+            for batch in batches
+        ]
+        partials = await self._complete_partials(
+            [(self._group_label(batch), prompt) for batch, prompt in zip(batches, prompts)],
+            "analysing group"
+        )
+        
+        return await self._reduce_prompt(partials, request)
+    
+    async def _reduce_prompt(self, partials: List[Tuple[str, Dict[str, Any]]], request: Dict[str, Any]) -> str:
+        """Prompt merging the group analyses, pre-merging them in rounds while they exceed the budget"""
+        while True:
+            groups = self._batch_partials(partials, ANALYSIS_TOKEN_BUDGET)
+            if len(groups) == 1:
+                return self._create_reduce_prompt(groups[0], request["industry"], request["company_size"])
+            
+            partials = await self._complete_partials(
+                [
+                    (
+                        "; ".join(name for name, _ in group),
+                        self._create_reduce_prompt(group, request["industry"], request["company_size"])
+                    )
+                    for group in groups
+                ],
+                "merging groups"
+            )
+    
+    async def _complete_partials(
+        self,
+        labelled_prompts: List[Tuple[str, str]],
+        action: str
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Complete (label, prompt) pairs in parallel, keeping only the successful analyses.
+
+        Failed calls are dropped so placeholders never reach the merge; if every
+        call fails, AnalysisUnavailable is raised with the first failure's placeholder.
+        """
+        completions = await gather_bounded(
+            [self._complete(prompt) for _, prompt in labelled_prompts], ANALYSIS_MAP_CONCURRENCY
+        )
+        
+        partials = []
+        failures = []
+        for (label, _), completion in zip(labelled_prompts, completions):
+            if isinstance(completion, BaseException):
+                print(f"Error {action} {label}: {str(completion)}")
+                failures.append(completion)
+                continue
+            partials.append((label, self._process_response(completion)))
+        if not partials:
+            first = failures[0]
+            if isinstance(first, AnalysisUnavailable):
+                raise first
+            raise AnalysisUnavailable(self._exception_response(first))
+        return partials
+    
+    def _batch_members(self, members: List[Dict[str, Any]], budget: int) -> List[List[Dict[str, Any]]]:
+        """Group members by department and role, then pack the groups into batches under the budget"""
+        departments: Dict[str, List[Dict[str, Any]]] = {}
+        for member in members:
+            departments.setdefault(member["department"], []).append(member)
+        
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for department_members in departments.values():
+            # Keep identical roles next to each other
+            department_members = sorted(department_members, key=lambda member: member["role"])
+            group_tokens = estimate_tokens(self._format_team_info(department_members))
+            if batch and batch_tokens + group_tokens > budget:
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            if group_tokens <= budget:
+                batch.extend(department_members)
+                batch_tokens += group_tokens
+                continue
+            
+            # Departments larger than the budget are split member by member
+            for member in department_members:
+                member_tokens = estimate_tokens(self._format_team_info([member]))
+                if batch and batch_tokens + member_tokens > budget:
+                    batches.append(batch)
+                    batch, batch_tokens = [], 0
+                batch.append(member)
+                batch_tokens += member_tokens
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def _batch_partials(
+        self,
+        partials: List[Tuple[str, Dict[str, Any]]],
+        budget: int
+    ) -> List[List[Tuple[str, Dict[str, Any]]]]:
+        """Pack group analyses into reduce inputs under the budget, at least two per input"""
+        groups = []
+        group = []
+        group_tokens = 0
+        for partial in partials:
+            tokens = estimate_tokens(json.dumps(partial))
+            if len(group) >= 2 and group_tokens + tokens > budget:
+                groups.append(group)
+                group, group_tokens = [], 0
+            group.append(partial)
+            group_tokens += tokens
+        if group:
+            # A lone leftover joins the previous input so every round shrinks
+            if len(group) == 1 and groups:
+                groups[-1].extend(group)
+            else:
+                groups.append(group)
+        return groups
+    
+    def _group_label(self, members: List[Dict[str, Any]]) -> str:
+        departments = dict.fromkeys(member["department"] for member in members)
+        return ", ".join(departments)
+    
+    def _create_batch_prompt(self, team_info: str, group: str, industry: str, company_size: str) -> str:
+        """Create prompt analysing one group of a large team"""
+        return f"""
+        Analyze the impact of generative AI on the following group of a larger team ({group}):
+        
+        Team Information:
+        {team_info}
+        
+        Industry: {industry}
+        Company Size: {company_size}
+        
+        Please provide a concise analysis of this group including:
+        1. Impact Summary: How AI will affect each role in the group
+        2. Recommendations: Specific actions for AI integration and workforce adaptation
+        3. Risk Assessment: Potential challenges and mitigation strategies
+        4. Upskilling Opportunities: Key skills and training needed
+        
+        Format the response as a structured JSON with these sections.
+        """
+    
+    def _create_role_prompt(self, role: Dict[str, Any], industry: str, company_size: str) -> str:
+        """Create prompt assessing one role, independent of the team it belongs to"""
+        responsibilities = "\n".join(f"- {resp}" for resp in role["responsibilities"])
+        background = (role.get("enhanced_description") or "")[:ROLE_CONTEXT_CHARS]
+        return f"""
+        Analyze the impact of generative AI on the following role and provide detailed recommendations:
+        
+        Role: {role["role"]}
+        Key Responsibilities:
+        {responsibilities}
+        
+        Background on the role:
+        {background or "None available"}
+        
+        Industry: {industry}
+        Company Size: {company_size}
+        
+        Please provide a concise analysis of this role including:
+        1. Impact Summary: How AI will affect the role
+        2. Recommendations: Specific actions for AI integration and workforce adaptation
+        3. Risk Assessment: Potential challenges and mitigation strategies
+        4. Upskilling Opportunities: Key skills and training needed
+        
+        Format the response as a structured JSON with these sections.
+        """
+    
+    def _create_reduce_prompt(
+        self,
+        partials: List[Tuple[str, Dict[str, Any]]],
+        industry: str,
+        company_size: str
+    ) -> str:
+        """Create prompt merging group analyses into one team analysis"""
+        group_analyses = "\n\n".join(
+            f"Group: {label}\n{json.dumps(analysis)}" for label, analysis in partials
+        )
+        return f"""
+        The following are analyses of the impact of generative AI on separate groups or roles of one team.
+        Merge them into a single analysis of the whole team. Groups marked assessment_unavailable
+        have no analysis yet; assess them from their role and responsibilities:
+        
+        {group_analyses}
+        
+        Industry: {industry}
+        Company Size: {company_size}
+        
+        Please provide a comprehensive analysis including:
+        1. Impact Summary: How AI will affect each role and the team as a whole
+        2. Recommendations: Specific actions for AI integration and workforce adaptation, without duplicates
+        3. Risk Assessment: Potential challenges and mitigation strategies
+        4. Upskilling Opportunities: Key skills and training needed
+        
+        Format the response as a structured JSON with these sections.
+        """
+    
     def _create_prompt(self, team_info: str, industry: str, company_size: str) -> str:
         """Create prompt for AI analysis"""
         return f"""
@@ -58,62 +496,211 @@ class AIWorkforceAnalyzer:
         """
     
     async def _get_ai_analysis(self, prompt: str) -> str:
-        """Get analysis from OpenAI API"""
+        """Get analysis from OpenAI API, or a placeholder analysis if that fails"""
+        try:
+            return await self._complete(prompt)
+        except AnalysisUnavailable as e:
+            return e.fallback
+
+    async def _complete(self, prompt: str) -> str:
+        """Completion for prompt from the OpenAI API; raises AnalysisUnavailable on failure"""
         if not self.api_key:
-            # If no API key, return a mock response
-            return json.dumps({
-                "Impact Summary": {"summary": "Mock impact analysis without API key"},
-                "Recommendations": ["Enable AI tools for this team", "Provide AI training"],
-                "Risk Assessment": {"risks": "Without API key, detailed analysis is not available"},
-                "Upskilling Opportunities": ["Learn prompt engineering", "Develop data analysis skills"]
-            })
-        
-        headers = {
+            # If no API key, fall back to a mock response
+            raise AnalysisUnavailable(self._mock_response())
+        
+        headers = self._request_headers()
+        data = self._request_data(prompt)
+        
+        # Repeat prompts are answered from the completion cache
+        key = completion_key(self.model, self.temperature, prompt)
+        cached = await asyncio.to_thread(self.cache.get, key) if self.cache else None
+        if cached is not None:
+            return cached
+        
+        async def request():
+            session = await self._get_session()
+            async with session.post(self.api_url, headers=headers, json=data) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    content = result["choices"][0]["message"]["content"]
+                    # Only successful completions are cached
+                    if self.cache:
+                        await asyncio.to_thread(self.cache.set, key, content)
+                    return content
+                error_detail = await response.text()
+                if response.status in RETRYABLE_STATUSES:
+                    raise RetryableStatus(
+                        response.status,
+                        parse_retry_after(response.headers.get("Retry-After")),
+                        error_detail
+                    )
+                print(f"Error calling OpenAI API: {response.status} - {error_detail}")
+                raise AnalysisUnavailable(self._api_error_response(response.status))
+        
+        try:
+            return await self._inflight.do(key, lambda: self.limiter.call(request))
+        except AnalysisUnavailable:
+            raise
+        except RetryableStatus as e:
+            print(f"Error calling OpenAI API after retries: {e.status} - {e.detail}")
+            raise AnalysisUnavailable(self._api_error_response(e.status))
+        except Exception as e:
+            print(f"Exception calling OpenAI API: {str(e)}")
+            raise AnalysisUnavailable(self._exception_response(e))
+
+    async def _stream_ai_analysis(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the analysis from the OpenAI API as content deltas"""
+        if not self.api_key:
+            yield self._mock_response()
+            return
+        
+        # A cached completion is replayed as a single delta
+        key = completion_key(self.model, self.temperature, prompt)
+        cached = await asyncio.to_thread(self.cache.get, key) if self.cache else None
+        if cached is not None:
+            yield cached
+            return
+        
+        headers = self._request_headers()
+        data = {**self._request_data(prompt), "stream": True}
+        deltas: asyncio.Queue = asyncio.Queue()
+        
+        async def stream_request():
+            # The whole stream is read inside the limiter, so its concurrency
+            # slot is held until the completion has finished streaming
+            started = False
+            session = await self._get_session()
+            async with session.post(self.api_url, headers=headers, json=data) as response:
+                if response.status != 200:
+                    error_detail = await response.text()
+                    if response.status in RETRYABLE_STATUSES:
+                        raise RetryableStatus(
+                            response.status,
+                            parse_retry_after(response.headers.get("Retry-After")),
+                            error_detail
+                        )
+                    print(f"Error calling OpenAI API: {response.status} - {error_detail}")
+                    return self._api_error_response(response.status)
+                try:
+                    async for delta in self._iter_stream_deltas(response):
+                        started = True
+                        deltas.put_nowait(delta)
+                except BaseException as e:
+                    # Drop the connection rather than reuse a half-read stream
+                    response.close()
+                    if started and isinstance(e, Exception):
+                        # Retries only happen before the first token arrives
+                        raise StreamInterrupted(str(e) or type(e).__name__) from e
+                    raise
+            return None
+        
+        async def produce():
+            try:
+                return await self.limiter.call(stream_request)
+            finally:
+                deltas.put_nowait(_STREAM_END)
+        
+        task = asyncio.create_task(produce())
+        chunks = []
+        try:
+            while True:
+                delta = await deltas.get()
+                if delta is _STREAM_END:
+                    break
+                chunks.append(delta)
+                yield delta
+            await asyncio.wait([task])
+        finally:
+            # Stop reading upstream if our caller goes away
+            if not task.done():
+                task.cancel()
+        
+        try:
+            error_response = task.result()
+        except StreamInterrupted as e:
+            print(f"Exception reading OpenAI stream: {str(e)}")
+            return
+        except RetryableStatus as e:
+            print(f"Error calling OpenAI API after retries: {e.status} - {e.detail}")
+            error_response = self._api_error_response(e.status)
+        except Exception as e:
+            print(f"Exception calling OpenAI API: {str(e)}")
+            error_response = self._exception_response(e)
+        if error_response is not None:
+            yield error_response
+            return
+        
+        # Only complete streams are cached
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, key, "".join(chunks))
+
+    @staticmethod
+    async def _replay(text: str) -> AsyncIterator[str]:
+        """A finished completion as a single delta"""
+        yield text
+
+    @staticmethod
+    async def _iter_stream_deltas(response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+        """Content deltas from a chat-completion event stream"""
+        async for raw_line in response.content:
+            line = raw_line.decode("utf-8").strip()
+            if not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                break
+            choices = json.loads(payload).get("choices") or []
+            if choices:
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+
+    def _request_headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
-        
-        data = {
+
+    def _request_data(self, prompt: str) -> Dict[str, Any]:
+        return {
             "model": self.model,
             "messages": [{"role": "user", "content": prompt}],
             "temperature": self.temperature
         }
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.api_url, headers=headers, json=data) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result["choices"][0]["message"]["content"]
-                    else:
-                        error_detail = await response.text()
-                        print(f"Error calling OpenAI API: {response.status} - {error_detail}")
-                        return json.dumps({
-                            "Impact Summary": {"summary": f"API Error {response.status}"},
-                            "Recommendations": ["Please check API configuration"],
-                            "Risk Assessment": {"risks": "API integration issue"},
-                            "Upskilling Opportunities": ["Review system configuration"]
-                        })
-        except Exception as e:
-            print(f"Exception calling OpenAI API: {str(e)}")
-            return json.dumps({
-                "Impact Summary": {"summary": "Analysis failed due to API error"},
-                "Recommendations": ["Check API key and connectivity"],
-                "Risk Assessment": {"risks": f"Technical error: {str(e)}"},
-                "Upskilling Opportunities": ["Setup reliable API access"]
-            })
+
+    def _mock_response(self) -> str:
+        """Placeholder analysis used when no API key is configured"""
+        return json.dumps({
+            "Impact Summary": {"summary": "Mock impact analysis without API key"},
+            "Recommendations": ["Enable AI tools for this team", "Provide AI training"],
+            "Risk Assessment": {"risks": "Without API key, detailed analysis is not available"},
+            "Upskilling Opportunities": ["Learn prompt engineering", "Develop data analysis skills"]
+        })
+
+    def _exception_response(self, error: Exception) -> str:
+        """Placeholder analysis returned when calling the API raised"""
+        return json.dumps({
+            "Impact Summary": {"summary": "Analysis failed due to API error"},
+            "Recommendations": ["Check API key and connectivity"],
+            "Risk Assessment": {"risks": f"Technical error: {str(error)}"},
+            "Upskilling Opportunities": ["Setup reliable API access"]
+        })
+
+    def _api_error_response(self, status: int) -> str:
+        """Placeholder analysis returned when the API answers with an error"""
+        return json.dumps({
+            "Impact Summary": {"summary": f"API Error {status}"},
+            "Recommendations": ["Please check API configuration"],
+            "Risk Assessment": {"risks": "API integration issue"},
+            "Upskilling Opportunities": ["Review system configuration"]
+        })
     
     def _process_response(self, response: str) -> Dict[str, Any]:
         """Process the response and structure it"""
         try:
             # Try to parse as JSON
             parsed = json.loads(response)
-            return {
-                "impact_summary": parsed.get("Impact Summary", {}),
-                "recommendations": parsed.get("Recommendations", []),
-                "risk_assessment": parsed.get("Risk Assessment", {}),
-                "upskilling_opportunities": parsed.get("Upskilling Opportunities", [])
-            }
+            return self._structure_sections(parsed)
         except json.JSONDecodeError:
             # Fallback if not valid JSON
             return {
@@ -123,6 +710,15 @@ class AIWorkforceAnalyzer:
                 "upskilling_opportunities": ["Please consult with HR for appropriate upskilling paths"]
             }
 
+    def _structure_sections(self, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """Result keys for the parsed analysis sections"""
+        return {
+            "impact_summary": parsed.get("Impact Summary", {}),
+            "recommendations": parsed.get("Recommendations", []),
+            "risk_assessment": parsed.get("Risk Assessment", {}),
+            "upskilling_opportunities": parsed.get("Upskilling Opportunities", [])
+        }
+
     def _format_team_info(self, members: List[Dict[str, Any]]) -> str:
         """Format team member information for analysis"""
         formatted_info = []
@@ -40,4 +40,20 @@ class Analysis(Base):
     upskilling_opportunities = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    team = relationship("Team", back_populates="analyses") 
\ No newline at end of file
+    team = relationship("Team", back_populates="analyses") 
+
+
+class RoleAssessment(Base):
+    __tablename__ = "role_assessments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)
+    role = Column(String)
+    responsibilities = Column(JSON)
+    industry = Column(String)
+    company_size = Column(String)
+    assessment = Column(JSON)
+    article_references = Column(JSON)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
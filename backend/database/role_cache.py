@@ -0,0 +1,64 @@
+from typing import Any, Dict, List
+from datetime import datetime, timedelta
+import hashlib
+import json
+import os
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .models import RoleAssessment
+
+ROLE_CACHE_TTL_DAYS = float(os.getenv("ROLE_CACHE_TTL_DAYS", "30"))
+
+def _normalize(value: str) -> str:
+    return " ".join(str(value).lower().split())
+
+def role_cache_key(role: str, responsibilities: List[str], industry: str, company_size: str) -> str:
+    """Hash of the normalized role, responsibilities (in any order), industry and company size"""
+    normalized = [
+        _normalize(role),
+        sorted(_normalize(resp) for resp in responsibilities if str(resp).strip()),
+        _normalize(industry),
+        _normalize(company_size)
+    ]
+    return hashlib.sha256(json.dumps(normalized).encode("utf-8")).hexdigest()
+
+def get_role_assessments(db: Session, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Assessment and article references for the keys that have a fresh entry"""
+    if not keys:
+        return {}
+    cutoff = datetime.utcnow() - timedelta(days=ROLE_CACHE_TTL_DAYS)
+    rows = (
+        db.query(RoleAssessment)
+        .filter(RoleAssessment.cache_key.in_(keys), RoleAssessment.created_at >= cutoff)
+        .all()
+    )
+    # Read the values before the commit expires the rows
+    cached = {
+        row.cache_key: {"assessment": row.assessment, "article_references": row.article_references or []}
+        for row in rows
+    }
+    now = datetime.utcnow()
+    for row in rows:
+        row.hits = (row.hits or 0) + 1
+        row.last_used_at = now
+    if rows:
+        db.commit()
+    return cached
+
+def save_role_assessments(db: Session, entries: List[Dict[str, Any]]):
+    """Insert or refresh assessments; each entry holds the RoleAssessment columns"""
+    now = datetime.utcnow()
+    for entry in entries:
+        row = db.query(RoleAssessment).filter(RoleAssessment.cache_key == entry["cache_key"]).first()
+        if row is None:
+            row = RoleAssessment(cache_key=entry["cache_key"])
+            db.add(row)
+        for name, value in entry.items():
+            setattr(row, name, value)
+        row.created_at = now
+        row.last_used_at = now
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another request stored the same role first
+            db.rollback()
@@ -1,19 +1,37 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import AsyncIterator, List, Optional, Dict, Tuple
 import os
 import glob
+import asyncio
+import itertools
 import json
+import shutil
 import uuid
 from datetime import datetime
 from dotenv import load_dotenv
 from ai_agent.analyzer import AIWorkforceAnalyzer
 from database.models import Base, engine
-from database.database import get_db
+from database.database import SessionLocal, get_db
+from database.role_cache import get_role_assessments, role_cache_key, save_role_assessments
 from sqlalchemy.orm import Session
 from services.rag_service import RAGService
 from services.web_search import WebSearchService
+from services.embedding_models import model_registry
+from services.pdf_extraction import extract_pdf_texts
+from services.upload_queue import UploadJob, UploadJobQueue
+from services.job_extraction import (
+    extract_html_jobs,
+    extract_pdf_jobs,
+    find_sqlite_job_tables,
+    iter_csv_jobs,
+    iter_sqlite_jobs,
+    missing_csv_columns,
+    shutdown_process_pool
+)
 
 # Load environment variables
 load_dotenv()
@@ -43,10 +61,22 @@ if not os.path.exists(KNOWLEDGE_ARTICLES_FILE):
     with open(KNOWLEDGE_ARTICLES_FILE, "w") as f:
         json.dump([], f)
 
+def knowledge_article_to_document(article: dict) -> dict:
+    """Convert a stored knowledge article into a RAG document"""
+    return {
+        "name": article["title"],
+        "content": article["content"],
+        "source": f"Knowledge Base: {article['title']}",
+        "id": article["id"]
+    }
+
 # Function to load articles from the Articles folder
 def load_articles():
     articles = []
     article_files = glob.glob("Articles/*.txt") + glob.glob("Articles/*.md") + glob.glob("Articles/*.pdf")
+
+    # Parse PDFs up front in the shared process pool; unchanged files come from the cache
+    pdf_texts = extract_pdf_texts([p for p in article_files if p.lower().endswith('.pdf')])
     
     for file_path in article_files:
         try:
@@ -61,10 +91,10 @@ def load_articles():
                         "content": content,
                         "source": file_path
                     })
-            elif file_extension == '.pdf':
+            elif file_extension == '.pdf' and file_path in pdf_texts:
                 articles.append({
                     "name": article_name,
-                    "content": "PDF content placeholder",
+                    "content": pdf_texts[file_path],
                     "source": file_path
                 })
         except Exception as e:
@@ -76,12 +106,7 @@ def load_articles():
             with open(KNOWLEDGE_ARTICLES_FILE, "r") as f:
                 knowledge_articles = json.load(f)
                 for article in knowledge_articles:
-                    articles.append({
-                        "name": article["title"],
-                        "content": article["content"],
-                        "source": f"Knowledge Base: {article['title']}",
-                        "id": article["id"]
-                    })
+                    articles.append(knowledge_article_to_document(article))
     except Exception as e:
         print(f"Error loading knowledge articles: {str(e)}")
     
@@ -90,8 +115,25 @@ def load_articles():
 # Initialize services
 articles = load_articles()
 ai_analyzer = AIWorkforceAnalyzer()
-rag_service = RAGService(articles=articles)  
 web_search_service = WebSearchService()
+rag_service = RAGService(articles=articles, web_search=web_search_service)
+upload_queue = UploadJobQueue()
+
+@app.on_event("startup")
+async def start_services():
+    await ai_analyzer.start()
+    await web_search_service.start()
+    await asyncio.to_thread(web_search_service.cache.purge_expired)
+    await upload_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    await upload_queue.close()
+    await web_search_service.close()
+    await ai_analyzer.close()
+    ai_analyzer.cache.close()
+    rag_service.executor.shutdown()
+    shutdown_process_pool()
 
 class TeamMember(BaseModel):
     role: str
@@ -145,58 +187,282 @@ async def enhance_job(request: JobEnhancementRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+ALLOWED_UPLOAD_TYPES = ['.csv', '.db', '.sqlite', '.sqlite3', '.pdf', '.html', '.txt']
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "50"))
+UPLOAD_TEMP_DIR = os.getenv("UPLOAD_TEMP_DIR", "temp")
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "100")) * 1024 * 1024
+# Room for multipart boundaries and headers on top of the file itself
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+UPLOAD_TOO_LARGE_DETAIL = f"File is too large. Maximum upload size is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+UPLOAD_STREAM_CONCURRENCY = int(os.getenv("UPLOAD_STREAM_CONCURRENCY", "8"))
+ROLE_CACHE_ENABLED = os.getenv("ROLE_CACHE_ENABLED", "true").lower() == "true"
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+class UploadSizeLimitMiddleware:
+    """Enforce the upload size limit while the request body arrives.
+
+    FastAPI spools the whole multipart body to disk before the endpoint
+    runs, so the limit has to apply before that: a larger Content-Length
+    is refused without reading the body, and a body without one is cut
+    off as soon as it passes the limit.
+    """
+
+    def __init__(self, app, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": UPLOAD_TOO_LARGE_DETAIL})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside form parsing, so FastAPI answers with this status
+                    raise HTTPException(status_code=413, detail=UPLOAD_TOO_LARGE_DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path="/api/upload",
+    max_bytes=MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD
+)
+
 @app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+    file: UploadFile = File(...),
+    background: bool = False,
+    stream: Optional[str] = None
+):
     try:
+        if stream is not None and stream not in STREAM_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown stream format. Allowed formats: {', '.join(STREAM_FORMATS)}"
+            )
+        if stream is not None and background:
+            raise HTTPException(
+                status_code=400,
+                detail="Background jobs can't be streamed; poll the job's status_url instead"
+            )
+
         # Validate file type
-        allowed_types = ['.csv', '.db', '.sqlite', '.sqlite3', '.pdf', '.html', '.txt']
         file_ext = os.path.splitext(file.filename)[1].lower()
-        if file_ext not in allowed_types:
+        if file_ext not in ALLOWED_UPLOAD_TYPES:
             raise HTTPException(
                 status_code=400,
-                detail=f"File type not allowed. Allowed types: {', '.join(allowed_types)}"
+                detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_UPLOAD_TYPES)}"
             )
 
-        # Save file temporarily
-        file_path = f"temp/{file.filename}"
-        os.makedirs("temp", exist_ok=True)
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-
-        # Process file based on type
-        jobs = []
-        if file_ext in ['.csv', '.db', '.sqlite', '.sqlite3']:
-            jobs = await process_database_file(file_path)
-        elif file_ext in ['.pdf', '.html']:
-            jobs = await process_document_file(file_path)
-
-        os.remove(file_path)
+        # Stream the file to a unique temporary path
+        file_path = await save_upload(file)
 
-        # Enhance each job with RAG
-        enhanced_jobs = []
-        for job in jobs:
+        # Hand the file to a background worker and return the job id straight away
+        if background:
             try:
-                result = await rag_service.retrieve_relevant_info(
-                    job['title'],
-                    job.get('description')
+                job = await upload_queue.submit(
+                    file.filename,
+                    lambda job: run_upload_job(job, file_path, file_ext),
+                    cleanup=lambda: remove_upload(file_path)
                 )
-                enhanced_jobs.append({
-                    **job,
-                    'enhanced_description': result.enhanced_description,
-                    'web_references': result.web_references,
-                    'confidence_score': result.confidence_score,
-                    'knowledge_sources': result.knowledge_sources,
-                    'article_references': result.article_references if hasattr(result, 'article_references') else []
-                })
-            except Exception as e:
-                enhanced_jobs.append(job)
+            except BaseException:
+                remove_upload(file_path)
+                raise
+            return JSONResponse(
+                status_code=202,
+                content={"job_id": job.id, "status": job.status, "status_url": f"/api/upload/{job.id}"}
+            )
 
-        return {"jobs": enhanced_jobs}
+        try:
+            jobs = await parse_uploaded_file(file_path, file_ext)
+        finally:
+            remove_upload(file_path)
+
+        # Emit each job as soon as its lookup finishes
+        if stream is not None:
+            return StreamingResponse(
+                format_job_stream(stream_enhanced_jobs(jobs), stream, len(jobs)),
+                media_type=STREAM_FORMATS[stream]
+            )
+
+        return {"jobs": await enhance_jobs(jobs)}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def save_upload(file: UploadFile) -> str:
+    """Copy an upload to its own temp directory in chunks.
+
+    UploadSizeLimitMiddleware has already bounded the request body; the
+    checks here only catch a file that fits the body limit but not the
+    file limit, without copying it first where its size is known.
+    """
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=UPLOAD_TOO_LARGE_DETAIL)
+    upload_dir = os.path.join(UPLOAD_TEMP_DIR, uuid.uuid4().hex)
+    os.makedirs(upload_dir)
+    # Keep the original name (sources are reported by basename) but never its directories
+    file_path = os.path.join(upload_dir, os.path.basename(file.filename))
+
+    size = 0
+    try:
+        with open(file_path, "wb") as buffer:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=UPLOAD_TOO_LARGE_DETAIL)
+                buffer.write(chunk)
+    except BaseException:
+        remove_upload(file_path)
+        raise
+    return file_path
+
+def remove_upload(file_path: str):
+    """Delete a temporary upload and its directory"""
+    shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+
+@app.get("/api/upload/{job_id}")
+async def get_upload_job(job_id: str, offset: int = 0):
+    """
+    Progress of a background upload and its results from offset onwards
+    """
+    job = upload_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Upload job {job_id} not found")
+    return jsonable_encoder(job.to_dict(offset=max(0, offset)))
+
+async def parse_uploaded_file(file_path: str, file_ext: str) -> List[dict]:
+    """Extract jobs from an uploaded file based on its type"""
+    if file_ext in ['.csv', '.db', '.sqlite', '.sqlite3']:
+        return await process_database_file(file_path)
+    elif file_ext in ['.pdf', '.html']:
+        return await process_document_file(file_path)
+    return []
+
+async def iter_job_batches(file_path: str, file_ext: str, batch_size: int) -> AsyncIterator[List[dict]]:
+    """Yield extracted jobs in batches; CSV and SQLite files are read incrementally off the event loop"""
+    streamed_jobs = None
+    if file_ext == '.csv' and not await asyncio.to_thread(missing_csv_columns, file_path):
+        streamed_jobs = iter_csv_jobs(file_path)
+    elif file_ext in ['.db', '.sqlite', '.sqlite3']:
+        job_tables = await asyncio.to_thread(find_sqlite_job_tables, file_path)
+        if job_tables:
+            streamed_jobs = iter_sqlite_jobs(file_path, job_tables)
+
+    if streamed_jobs is not None:
+        found = False
+        while True:
+            batch = await asyncio.to_thread(lambda: list(itertools.islice(streamed_jobs, batch_size)))
+            if not batch:
+                break
+            found = True
+            yield batch
+        # Same fallback as the synchronous path, e.g. job tables without title/description
+        if not found:
+            yield [no_jobs_found_job()]
+        return
+
+    jobs = await parse_uploaded_file(file_path, file_ext)
+    for start in range(0, len(jobs), batch_size):
+        yield jobs[start:start + batch_size]
+
+async def enhance_jobs(jobs: List[dict]) -> List[dict]:
+    """Enhance jobs with RAG in one batched encode and search"""
+    results = await rag_service.retrieve_relevant_info_batch(
+        [str(job['title']) for job in jobs],
+        [job.get('description') for job in jobs],
+        return_exceptions=True
+    )
+
+    enhanced_jobs = []
+    for job, result in zip(jobs, results):
+        if isinstance(result, BaseException):
+            enhanced_jobs.append(job)
+            continue
+        enhanced_jobs.append({
+            **job,
+            'enhanced_description': result.enhanced_description,
+            'web_references': result.web_references,
+            'confidence_score': result.confidence_score,
+            'knowledge_sources': result.knowledge_sources,
+            'article_references': result.article_references if hasattr(result, 'article_references') else []
+        })
+    return enhanced_jobs
+
+async def stream_enhanced_jobs(jobs: List[dict]) -> AsyncIterator[Tuple[int, dict]]:
+    """Yield (index, enhanced job) pairs in completion order"""
+    semaphore = asyncio.Semaphore(UPLOAD_STREAM_CONCURRENCY)
+
+    async def enhance_one(index: int, job: dict) -> Tuple[int, dict]:
+        async with semaphore:
+            enhanced = await enhance_jobs([job])
+            return index, enhanced[0]
+
+    tasks = [asyncio.create_task(enhance_one(i, job)) for i, job in enumerate(jobs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop outstanding lookups if the client disconnects
+        for task in tasks:
+            task.cancel()
+
+async def format_job_stream(
+    results: AsyncIterator[Tuple[int, dict]],
+    stream_format: str,
+    total: int
+) -> AsyncIterator[str]:
+    """Serialize streamed jobs as NDJSON lines or server-sent events"""
+    async for index, job in results:
+        yield format_stream_event("job", {"index": index, "job": job}, stream_format)
+
+    yield format_stream_event("done", {"done": True, "total": total}, stream_format)
+
+def format_stream_event(event: str, payload: dict, stream_format: str) -> str:
+    """One NDJSON line, or one server-sent event named after the event"""
+    data = json.dumps(payload, default=str)
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {data}\n\n"
+    return data + "\n"
+
+async def run_upload_job(job: UploadJob, file_path: str, file_ext: str):
+    """Parse and enhance an upload in the background, publishing partial results.
+
+    The queue deletes the uploaded file when the job finishes.
+    """
+    job.update(status="parsing")
+    async for batch in iter_job_batches(file_path, file_ext, UPLOAD_BATCH_SIZE):
+        # Enhance each batch while the rest of the file is still being read
+        job.update(status="enhancing", total=job.total + len(batch))
+        enhanced = await enhance_jobs(batch)
+        job.results.extend(enhanced)
+        job.update(processed=len(job.results))
+
+def no_jobs_found_job() -> dict:
+    return create_sample_job("No Jobs Found", 
+           "Could not extract any jobs from the uploaded file. Please check the file format.")
+
 async def process_database_file(file_path: str) -> List[dict]:
     """Process uploaded database or CSV files"""
     try:
@@ -204,12 +470,8 @@ async def process_database_file(file_path: str) -> List[dict]:
         jobs = []
         
         if file_ext == '.csv':
-            import pandas as pd
-            df = pd.read_csv(file_path)
-            
             # Validate that the CSV has the required columns
-            required_columns = ['title', 'description', 'assignedTo']
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = await asyncio.to_thread(missing_csv_columns, file_path)
             
             if missing_columns:
                 print(f"Warning: CSV missing required columns: {missing_columns}")
@@ -217,108 +479,23 @@ async def process_database_file(file_path: str) -> List[dict]:
                 return [create_sample_job("CSV Format Error", 
                        f"The uploaded CSV is missing required columns: {', '.join(missing_columns)}. Please make sure your CSV has these columns: title, description, assignedTo, deadline (optional)")]
             
-            # Convert to list of jobs
-            for _, row in df.iterrows():
-                job = {
-                    'title': row['title'],
-                    'description': row['description'],
-                    'assignedTo': row['assignedTo'],
-                    'deadline': row.get('deadline', '2023-12-31'),
-                    'sourceDocument': os.path.basename(file_path)
-                }
-                
-                # Add optional fields if they exist
-                if 'priority' in row:
-                    job['priority'] = row['priority']
-                if 'status' in row:
-                    job['status'] = row['status']
-                if 'tags' in row and not pd.isna(row['tags']):
-                    job['tags'] = [tag.strip() for tag in str(row['tags']).split(',')]
-                
-                jobs.append(job)
+            # Convert to list of jobs, reading the CSV in chunks off the event loop
+            jobs = await asyncio.to_thread(lambda: list(iter_csv_jobs(file_path)))
                 
         elif file_ext in ['.db', '.sqlite', '.sqlite3']:
-            import sqlite3
-            
-            conn = sqlite3.connect(file_path)
-            cursor = conn.cursor()
-            
-            # Get list of tables
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = cursor.fetchall()
-            
-            potential_job_tables = []
-            for table in tables:
-                table_name = table[0]
-                
-                # Get column names for this table
-                cursor.execute(f"PRAGMA table_info({table_name});")
-                columns = cursor.fetchall()
-                column_names = [col[1].lower() for col in columns]
-                
-                # Check if this table has job-like columns
-                job_columns = ['title', 'description', 'assigned']
-                matches = sum(1 for col in job_columns if any(col in name.lower() for name in column_names))
-                
-                if matches >= 2:  # Table likely contains job data if it matches at least 2 columns
-                    potential_job_tables.append((table_name, column_names))
+            potential_job_tables = await asyncio.to_thread(find_sqlite_job_tables, file_path)
             
             if not potential_job_tables:
                 print(f"Warning: No job tables found in database {file_path}")
                 return [create_sample_job("Database Format Error", 
                        "No tables with job data found in the database. Please make sure your database has tables with job-related columns.")]
             
-            # Extract data from each potential job table
-            for table_name, column_names in potential_job_tables:
-                cursor.execute(f"SELECT * FROM {table_name} LIMIT 100;")
-                rows = cursor.fetchall()
-                
-                # Map column indices to job fields based on column names
-                column_mapping = {}
-                for i, col in enumerate(column_names):
-                    if 'title' in col.lower():
-                        column_mapping['title'] = i
-                    elif 'desc' in col.lower():
-                        column_mapping['description'] = i
-                    elif 'assign' in col.lower():
-                        column_mapping['assignedTo'] = i
-                    elif 'dead' in col.lower() or 'due' in col.lower():
-                        column_mapping['deadline'] = i
-                    elif 'prior' in col.lower():
-                        column_mapping['priority'] = i
-                    elif 'status' in col.lower():
-                        column_mapping['status'] = i
-                    elif 'tag' in col.lower():
-                        column_mapping['tags'] = i
-                
-                if 'title' not in column_mapping or 'description' not in column_mapping:
-                    continue  # Skip tables without basic required fields
-                
-                # Convert rows to jobs
-                for row in rows:
-                    job = {
-                        'title': row[column_mapping['title']],
-                        'description': row[column_mapping['description']],
-                        'assignedTo': row[column_mapping.get('assignedTo', 0)] if 'assignedTo' in column_mapping else "Unassigned",
-                        'deadline': row[column_mapping.get('deadline', 0)] if 'deadline' in column_mapping else "2023-12-31",
-                        'sourceDocument': os.path.basename(file_path)
-                    }
-                    
-                    if 'priority' in column_mapping:
-                        job['priority'] = row[column_mapping['priority']]
-                    if 'status' in column_mapping:
-                        job['status'] = row[column_mapping['status']]
-                    if 'tags' in column_mapping and row[column_mapping['tags']]:
-                        job['tags'] = [tag.strip() for tag in str(row[column_mapping['tags']]).split(',')]
-                    
-                    jobs.append(job)
-            
-            conn.close()
+            # Extract every row from each potential job table, a page at a time
+            jobs = await asyncio.to_thread(lambda: list(iter_sqlite_jobs(file_path, potential_job_tables)))
             
         # If no jobs were extracted, return a sample job
         if not jobs:
-            jobs = [create_sample_job("No Jobs Found", 
-                   "Could not extract any jobs from the uploaded file. Please check the file format.")]
+            jobs = [no_jobs_found_job()]
         
         return jobs
     except Exception as e:
@@ -333,77 +510,11 @@ async def process_document_file(file_path: str) -> List[dict]:
         
         if file_ext == '.pdf':
             try:
-                import fitz  # PyMuPDF
-                
-                text_content = ""
-                job_candidates = []
-                
-                # Extract text from PDF
-                with fitz.open(file_path) as doc:
-                    for page in doc:
-                        text_content += page.get_text()
-                
-                # Look for job-like sections in the text
-                lines = text_content.split('\n')
-                current_job = None
-                
-                for i, line in enumerate(lines):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # Check if this line looks like a job title (short line with capitalized words)
-                    if len(line) < 100 and any(word[0].isupper() for word in line.split() if word):
-                        # If we were building a job, save it
-                        if current_job and 'description' in current_job:
-                            job_candidates.append(current_job)
-                        
-                        # Start a new job
-                        current_job = {
-                            'title': line,
-                            'sourceDocument': os.path.basename(file_path)
-                        }
-                    elif current_job and 'description' not in current_job:
-                        # Add the first non-title line as description
-                        current_job['description'] = line
-                        
-                        # Look for assignee information in nearby lines
-                        for j in range(i+1, min(i+10, len(lines))):
-                            if 'assign' in lines[j].lower() or 'responsible' in lines[j].lower():
-                                assignee_line = lines[j].strip()
-                                parts = assignee_line.split(':')
-                                if len(parts) > 1:
-                                    current_job['assignedTo'] = parts[1].strip()
-                                    break
-                        
-                        # If no assignee found, use a default
-                        if 'assignedTo' not in current_job:
-                            current_job['assignedTo'] = "Unassigned"
-                        
-                        # Look for deadline information
-                        for j in range(i+1, min(i+10, len(lines))):
-                            if any(term in lines[j].lower() for term in ['deadline', 'due date', 'due by']):
-                                deadline_line = lines[j].strip()
-                                current_job['deadline'] = deadline_line.split(':')[-1].strip()
-                                break
-                        
-                        # If no deadline found, use a default
-                        if 'deadline' not in current_job:
-                            current_job['deadline'] = "2023-12-31"
-                    
-                # Save the last job if we were building one
-                if current_job and 'description' in current_job:
-                    job_candidates.append(current_job)
-                
-                # Clean up jobs (ensure they have all required fields and reasonable content)
-                jobs = []
-                for job in job_candidates:
-                    if len(job['title']) > 5 and len(job['description']) > 10:
-                        jobs.append(job)
+                # Pages are extracted and classified in parallel, then merged in page order
+                jobs, preview = await asyncio.to_thread(extract_pdf_jobs, file_path)
                 
                 if not jobs:
                     # If we couldn't extract structured jobs, create a sample with the first 1000 chars of content
-                    preview = text_content[:1000] + "..." if len(text_content) > 1000 else text_content
                     jobs = [create_sample_job(
                         "PDF Content", 
                         f"Content extracted from PDF: {preview}",
@@ -419,74 +530,14 @@ async def process_document_file(file_path: str) -> List[dict]:
                 
         elif file_ext == '.html':
             try:
-                from bs4 import BeautifulSoup
-                
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    html_content = f.read()
-                
-                soup = BeautifulSoup(html_content, 'html.parser')
-                
-                # Try to extract jobs from HTML
-                jobs = []
-                
-                # Look for job listings in common container elements
-                job_containers = soup.select('div.job, article, section, .card, .listing')
-                
-                if not job_containers:
-                    # If no specific containers found, try headers as job titles
-                    headers = soup.select('h1, h2, h3')
-                    
-                    for header in headers:
-                        title = header.get_text().strip()
-                        if 5 < len(title) < 100:  # Reasonable title length
-                            # Look for description in the next sibling paragraph
-                            desc_elem = header.find_next('p')
-                            description = desc_elem.get_text().strip() if desc_elem else ""
-                            
-                            if len(description) > 10:
-                                jobs.append({
-                                    'title': title,
-                                    'description': description,
-                                    'assignedTo': "Unassigned",
-                                    'deadline': "2023-12-31",
-                                    'sourceDocument': os.path.basename(file_path)
-                                })
-                else:
-                    # Process job containers
-                    for container in job_containers:
-                        # Try to find title
-                        title_elem = container.select_one('h1, h2, h3, h4, .title, .job-title')
-                        if not title_elem:
-                            continue
-                            
-                        title = title_elem.get_text().strip()
-                        
-                        # Try to find description
-                        desc_elem = container.select_one('p, .description, .job-description')
-                        description = desc_elem.get_text().strip() if desc_elem else ""
-                        
-                        # Try to find assignee
-                        assignee_elem = container.select_one('.assignee, .assigned-to')
-                        assignee = assignee_elem.get_text().strip() if assignee_elem else "Unassigned"
-                        
-                        # Try to find deadline
-                        deadline_elem = container.select_one('.deadline, .due-date')
-                        deadline = deadline_elem.get_text().strip() if deadline_elem else "2023-12-31"
-                        
-                        jobs.append({
-                            'title': title,
-                            'description': description,
-                            'assignedTo': assignee,
-                            'deadline': deadline,
-                            'sourceDocument': os.path.basename(file_path)
-                        })
+                # Parsed in a worker thread; lxml streams the file, freeing finished subtrees
+                jobs, page_title, preview = await asyncio.to_thread(extract_html_jobs, file_path)
                 
                 if not jobs:
                     # If extraction failed, create a sample job with page title
-                    title = soup.title.string if soup.title else "HTML Document"
                     jobs = [create_sample_job(
-                        title, 
-                        f"Content from HTML document: {soup.get_text()[:500]}...",
+                        page_title or "HTML Document", 
+                        f"Content from HTML document: {preview}...",
                         os.path.basename(file_path)
                     )]
             except ImportError:
@@ -577,69 +628,226 @@ def create_sample_job(title, description, source_document=None):
 @app.post("/api/analyze-team", response_model=AnalysisResponse)
 async def analyze_team(
     request: TeamAnalysisRequest,
+    stream: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
     Analyze the impact of AI on a team and generate recommendations
     """
     try:
-        # Enhance each team member's role with RAG
-        enhanced_members = []
-        all_article_references = []
-        
-        for member in request.members:
-            enhanced_info = await enhance_job(
-                JobEnhancementRequest(
-                    title=member.role,
-                    description=" ".join(member.responsibilities),
-                    context=f"Industry: {request.industry}, Company Size: {request.company_size}"
-                )
+        if stream is not None and stream not in STREAM_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown stream format. Allowed formats: {', '.join(STREAM_FORMATS)}"
             )
-            
-            enhanced_members.append({
-                **member.dict(),
-                "enhanced_description": enhanced_info.enhanced_description,
-                "web_references": enhanced_info.web_references,
-                "confidence_score": enhanced_info.confidence_score,
-                "article_references": enhanced_info.article_references
-            })
-            
-            # Collect all article references
-            if enhanced_info.article_references:
-                all_article_references.extend(enhanced_info.article_references)
-
-        # Update request with enhanced information
-        enhanced_request = TeamAnalysisRequest(
-            **request.dict(),
-            members=enhanced_members
-        )
+
+        # Pass token deltas and finished sections through as they are generated;
+        # roles are assessed inside the stream so its first bytes go out at once
+        if stream is not None:
+            return StreamingResponse(
+                stream_team_analysis(request, stream),
+                media_type=STREAM_FORMATS[stream]
+            )
+
+        enhanced_request, all_article_references, role_assessments = await prepare_team_analysis(request, db)
 
         # Perform analysis with enhanced information
-        analysis_result = await ai_analyzer.analyze_team(enhanced_request)
-        
-        # Add article references to the analysis result
-        if not hasattr(analysis_result, 'article_references'):
-            analysis_result.article_references = []
-        
-        # Add unique article references
-        seen_refs = set()
-        for ref in all_article_references:
-            ref_key = f"{ref.get('name', '')}-{ref.get('source', '')}"
-            if ref_key not in seen_refs:
-                analysis_result.article_references.append(ref)
-                seen_refs.add(ref_key)
-                
+        analysis_result = await ai_analyzer.analyze_team(enhanced_request, role_assessments)
+        add_article_references(analysis_result, all_article_references)
         return analysis_result
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def prepare_team_analysis(
+    request: TeamAnalysisRequest,
+    db: Session
+) -> Tuple[dict, List[dict], Optional[List[Tuple[str, dict]]]]:
+    """Request to analyse, the articles it references, and role assessments when the role cache is on"""
+    if ROLE_CACHE_ENABLED:
+        # Reuse cached role assessments and only synthesize the team analysis
+        role_assessments, all_article_references = await assess_team_roles(request, db)
+        return request.dict(), all_article_references, role_assessments
+
+    enhanced_request, all_article_references = await enhance_team_request(request)
+    return enhanced_request, all_article_references, None
+
+async def enhance_team_request(request: TeamAnalysisRequest) -> Tuple[dict, List[dict]]:
+    """Team request with RAG-enhanced members, plus every article they reference"""
+    # Enhance every team member's role with RAG in one batched lookup;
+    # web fallbacks run concurrently and a failed member doesn't abort the rest
+    enhanced_members = []
+    all_article_references = []
+    context = f"Industry: {request.industry}, Company Size: {request.company_size}"
+    results = await rag_service.retrieve_relevant_info_batch(
+        [member.role for member in request.members],
+        [context] * len(request.members),
+        return_exceptions=True
+    )
+    
+    for member, enhanced_info in zip(request.members, results):
+        if isinstance(enhanced_info, BaseException):
+            print(f"Error enhancing team member {member.role}: {str(enhanced_info)}")
+            enhanced_members.append(member.dict())
+            continue
+
+        enhanced_members.append({
+            **member.dict(),
+            "enhanced_description": enhanced_info.enhanced_description,
+            "web_references": enhanced_info.web_references,
+            "confidence_score": enhanced_info.confidence_score,
+            "article_references": enhanced_info.article_references
+        })
+        
+        # Collect all article references
+        if enhanced_info.article_references:
+            all_article_references.extend(enhanced_info.article_references)
+
+    # Update request with enhanced information
+    enhanced_request = {
+        **request.dict(),
+        "members": enhanced_members
+    }
+    return enhanced_request, all_article_references
+
+async def assess_team_roles(
+    request: TeamAnalysisRequest,
+    db: Session
+) -> Tuple[List[Tuple[str, dict]], List[dict]]:
+    """(label, assessment) for every distinct role in the team, plus the articles they reference.
+
+    Members with the same normalized role and responsibilities share one
+    assessment. Assessments are looked up in the role cache first; RAG and
+    the LLM only run for the roles that are missing. Roles whose assessment
+    failed go to the synthesis as their raw role and responsibilities and
+    are not cached.
+    """
+    roles: Dict[str, List[TeamMember]] = {}
+    for member in request.members:
+        key = role_cache_key(member.role, member.responsibilities, request.industry, request.company_size)
+        roles.setdefault(key, []).append(member)
+
+    # The role cache uses a synchronous session, so keep it off the event loop
+    cached = await asyncio.to_thread(get_role_assessments, db, list(roles))
+    missing = [key for key in roles if key not in cached]
+
+    assessments = {key: entry["assessment"] for key, entry in cached.items()}
+    article_references = {key: entry["article_references"] for key, entry in cached.items()}
+    if missing:
+        context = f"Industry: {request.industry}, Company Size: {request.company_size}"
+        representatives = [roles[key][0] for key in missing]
+        results = await rag_service.retrieve_relevant_info_batch(
+            [member.role for member in representatives],
+            [context] * len(representatives),
+            return_exceptions=True
+        )
+
+        role_inputs = []
+        for key, member, enhanced_info in zip(missing, representatives, results):
+            if isinstance(enhanced_info, BaseException):
+                print(f"Error enhancing role {member.role}: {str(enhanced_info)}")
+                role_inputs.append(member.dict())
+                article_references[key] = []
+                continue
+            role_inputs.append({**member.dict(), "enhanced_description": enhanced_info.enhanced_description})
+            article_references[key] = enhanced_info.article_references or []
+
+        new_assessments = await ai_analyzer.assess_roles(role_inputs, request.industry, request.company_size)
+
+        entries = []
+        for key, member, (assessment, cacheable) in zip(missing, representatives, new_assessments):
+            if not cacheable:
+                # A placeholder would be synthesized as if it were a real assessment,
+                # so the synthesis assesses this role from its description instead
+                print(f"Role assessment unavailable for {member.role}, synthesizing it from its responsibilities")
+                assessments[key] = unassessed_role(member)
+                continue
+            assessments[key] = assessment
+            entries.append({
+                "cache_key": key,
+                "role": member.role,
+                "responsibilities": member.responsibilities,
+                "industry": request.industry,
+                "company_size": request.company_size,
+                "assessment": assessment,
+                "article_references": article_references[key]
+            })
+        await asyncio.to_thread(save_role_assessments, db, entries)
+
+    role_assessments = [(role_group_label(roles[key]), assessments[key]) for key in roles]
+    all_article_references = [ref for key in roles for ref in article_references[key]]
+    return role_assessments, all_article_references
+
+def unassessed_role(member: TeamMember) -> dict:
+    """Stand-in for a failed role assessment, for the synthesis to assess directly"""
+    return {
+        "assessment_unavailable": True,
+        "role": member.role,
+        "responsibilities": member.responsibilities
+    }
+
+def role_group_label(members: List[TeamMember]) -> str:
+    """Role name with how many members hold it, and where"""
+    departments = ", ".join(dict.fromkeys(member.department for member in members))
+    levels = ", ".join(dict.fromkeys(member.experience_level for member in members))
+    count = f"{len(members)} member" + ("s" if len(members) != 1 else "")
+    return f"{members[0].role} ({count}; departments: {departments}; experience: {levels})"
+
+def add_article_references(analysis_result: dict, article_references: List[dict]):
+    """Add the unique article references to an analysis result"""
+    analysis_result.setdefault("article_references", [])
+    
+    seen_refs = set()
+    for ref in article_references:
+        ref_key = f"{ref.get('name', '')}-{ref.get('source', '')}"
+        if ref_key not in seen_refs:
+            analysis_result["article_references"].append(ref)
+            seen_refs.add(ref_key)
+
+async def stream_team_analysis(request: TeamAnalysisRequest, stream_format: str) -> AsyncIterator[str]:
+    """Prepare and stream a team analysis as NDJSON lines or server-sent events.
+
+    Progress events are sent while members are enhanced or roles assessed,
+    before the synthesis starts streaming tokens.
+    """
+    try:
+        stage = "assessing_roles" if ROLE_CACHE_ENABLED else "enhancing_members"
+        yield format_stream_event("progress", {"progress": stage}, stream_format)
+        # The request's own session has closed by the time the stream runs
+        db = SessionLocal()
+        try:
+            enhanced_request, article_references, role_assessments = await prepare_team_analysis(request, db)
+        finally:
+            await asyncio.to_thread(db.close)
+        yield format_stream_event("progress", {"progress": "analysing"}, stream_format)
+
+        async for event, data in ai_analyzer.stream_team_analysis(enhanced_request, role_assessments):
+            # Payload keys tell the events apart in NDJSON, which has no event names
+            if event == "delta":
+                payload = {"text": data}
+            elif event == "section":
+                payload = {"section": data["name"], "value": data["value"]}
+            else:
+                add_article_references(data, article_references)
+                payload = {"result": data}
+            yield format_stream_event(event, payload, stream_format)
+    except Exception as e:
+        # The status line has been sent, so report the failure in the stream
+        print(f"Error streaming team analysis: {str(e)}")
+        yield format_stream_event("error", {"error": str(e)}, stream_format)
+
 @app.get("/api/health")
 async def health_check():
     """
     Health check endpoint
     """
-    return {"status": "healthy", "version": "1.0.0"}
+    return {
+        "status": "healthy",
+        "version": "1.0.0",
+        "embedding_model_load_seconds": model_registry.load_times()
+    }
 
 @app.get("/api/articles")
 async def get_articles():
@@ -648,6 +856,33 @@ async def get_articles():
     """
     return {"articles": [{"name": article["name"], "source": article["source"]} for article in articles]}
 
+@app.get("/api/rag/index-report")
+async def get_index_report(queries: int = 100, k: int = 10):
+    """
+    Compare recall and latency of the flat, HNSW and IVF-PQ index types on the current corpus
+    """
+    try:
+        return {
+            "configured_index_type": rag_service.index_config.index_type,
+            "report": await rag_service.executor.run(rag_service.index_report, num_queries=queries, k=k)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building index report: {str(e)}")
+
+@app.get("/api/rag/cache-stats")
+async def get_rag_cache_stats():
+    """
+    Hit and miss counters of the RAG query-result cache
+    """
+    return rag_service.result_cache.stats()
+
+@app.get("/api/analyze-team/cache-stats")
+async def get_completion_cache_stats():
+    """
+    Hit and miss counters of the LLM completion cache
+    """
+    return await asyncio.to_thread(ai_analyzer.cache.stats)
+
 # Knowledge Article Model
 class KnowledgeArticleCreate(BaseModel):
     title: str
@@ -674,8 +909,6 @@ async def get_knowledge_articles():
 @app.post("/api/knowledge-articles", response_model=KnowledgeArticleResponse)
 async def create_knowledge_article(article: KnowledgeArticleCreate):
     try:
-        global articles, rag_service
-        
         with open(KNOWLEDGE_ARTICLES_FILE, "r") as f:
             articles_data = json.load(f)
         
@@ -691,9 +924,10 @@ async def create_knowledge_article(article: KnowledgeArticleCreate):
         with open(KNOWLEDGE_ARTICLES_FILE, "w") as f:
             json.dump(articles_data, f, indent=2)
         
-        # Refresh RAG service with new knowledge
-        articles = load_articles()
-        rag_service = RAGService(articles=articles)
+        # Add the new article to the RAG index without a full rebuild
+        document = knowledge_article_to_document(new_article)
+        await rag_service.executor.run(rag_service.add_documents, [document])
+        articles.append(document)
         
         return new_article
     except Exception as e:
@@ -702,7 +936,7 @@ async def create_knowledge_article(article: KnowledgeArticleCreate):
 @app.delete("/api/knowledge-articles/{article_id}")
 async def delete_knowledge_article(article_id: str):
     try:
-        global articles, rag_service
+        global articles
         
         with open(KNOWLEDGE_ARTICLES_FILE, "r") as f:
             articles_data = json.load(f)
@@ -712,9 +946,9 @@ async def delete_knowledge_article(article_id: str):
         with open(KNOWLEDGE_ARTICLES_FILE, "w") as f:
             json.dump(articles_data, f, indent=2)
         
-        # Refresh RAG service with updated knowledge
-        articles = load_articles()
-        rag_service = RAGService(articles=articles)
+        # Remove the article from the RAG index without a full rebuild
+        await rag_service.executor.run(rag_service.remove_document, article_id)
+        articles = [a for a in articles if a.get("id") != article_id]
         
         return {"status": "success", "message": f"Article {article_id} deleted"}
     except Exception as e:
@@ -0,0 +1,44 @@
+from typing import List
+from dataclasses import dataclass
+import os
+import re
+
+# MiniLM truncates at 256 word pieces, so keep passages comfortably below that
+CHUNK_WORDS = int(os.getenv('RAG_CHUNK_WORDS', '160'))
+CHUNK_OVERLAP = int(os.getenv('RAG_CHUNK_OVERLAP', '40'))
+
+_WORD_PATTERN = re.compile(r'\S+')
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    start: int  # Character offset of the passage in the source text
+    end: int
+
+def chunk_text(
+    text: str,
+    chunk_words: int = CHUNK_WORDS,
+    overlap: int = CHUNK_OVERLAP
+) -> List[Chunk]:
+    """Split text into overlapping word windows, keeping character offsets"""
+    if chunk_words <= 0:
+        raise ValueError("chunk_words must be positive")
+    if not 0 <= overlap < chunk_words:
+        raise ValueError("overlap must be between 0 and chunk_words - 1")
+
+    words = [(m.start(), m.end()) for m in _WORD_PATTERN.finditer(text)]
+    if not words:
+        return []
+
+    chunks = []
+    step = chunk_words - overlap
+    for first in range(0, len(words), step):
+        window = words[first:first + chunk_words]
+        start, end = window[0][0], window[-1][1]
+        chunks.append(Chunk(text=text[start:end], start=start, end=end))
+
+        # The last window already reaches the end of the text
+        if first + chunk_words >= len(words):
+            break
+
+    return chunks
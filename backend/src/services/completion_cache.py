@@ -0,0 +1,93 @@
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import time
+from .sqlite_cache import SQLiteCache
+
+COMPLETION_CACHE_PATH = os.getenv('COMPLETION_CACHE_PATH', 'database/completion_cache.sqlite3')
+COMPLETION_CACHE_TTL = float(os.getenv('COMPLETION_CACHE_TTL', '604800'))
+COMPLETION_CACHE_MAX_ENTRIES = int(os.getenv('COMPLETION_CACHE_MAX_ENTRIES', '5000'))
+
+def completion_key(model: str, temperature: float, prompt: str) -> str:
+    """Content address of a completion request"""
+    payload = json.dumps([model, temperature, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class CompletionCache(SQLiteCache):
+    """SQLite cache of LLM completions keyed by a hash of model, temperature and prompt.
+
+    Entries expire after ttl seconds. Once the cache holds more than
+    max_entries, the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = COMPLETION_CACHE_PATH,
+        ttl: float = COMPLETION_CACHE_TTL,
+        max_entries: int = COMPLETION_CACHE_MAX_ENTRIES
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        super().__init__(path, [
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, completion TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used_at)"
+        ])
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached completion, or None if missing or expired"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT completion, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE completions SET last_used_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, completion: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, completion, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, completion, now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        # Expired entries first, then the least recently used beyond max_entries
+        cursor = self._conn.execute(
+            "DELETE FROM completions WHERE created_at < ?", (time.time() - self.ttl,)
+        )
+        self.evictions += cursor.rowcount
+        cursor = self._conn.execute(
+            "DELETE FROM completions WHERE key IN ("
+            "SELECT key FROM completions ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self.evictions += cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,45 @@
+from typing import Dict
+import threading
+import time
+from sentence_transformers import SentenceTransformer
+
+
+class EmbeddingModelRegistry:
+    """Process-wide cache of SentenceTransformer models.
+
+    Each model is loaded on first use and then shared by every caller,
+    so creating more RAGService instances does not load the weights again.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, SentenceTransformer] = {}
+        self._load_times: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str) -> SentenceTransformer:
+        """Return the shared model, loading it on first request"""
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            # Another thread may have loaded it while we waited
+            model = self._models.get(model_name)
+            if model is None:
+                start = time.perf_counter()
+                model = SentenceTransformer(model_name)
+                elapsed = time.perf_counter() - start
+                self._models[model_name] = model
+                self._load_times[model_name] = elapsed
+                print(f"Loaded embedding model {model_name} in {elapsed:.2f}s")
+        return model
+
+    def is_loaded(self, model_name: str) -> bool:
+        return model_name in self._models
+
+    def load_times(self) -> Dict[str, float]:
+        """Seconds spent loading each model, keyed by model name"""
+        return dict(self._load_times)
+
+
+model_registry = EmbeddingModelRegistry()
@@ -0,0 +1,156 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import numpy as np
+import faiss
+
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+INDEX_FILE = "index.faiss"
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of a document's content"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """On-disk embedding matrix and FAISS index keyed by content hash.
+
+    Rows of ``embeddings.npy`` line up with the ``hashes`` list in the
+    manifest, so unchanged documents are memory-mapped back in instead of
+    being re-encoded. The saved index records the document ids it was
+    built with so an incrementally updated index can be reloaded as-is.
+    """
+
+    def __init__(self, directory: str, model_name: str):
+        self.directory = directory
+        self.model_name = model_name
+        self.manifest_path = os.path.join(directory, MANIFEST_FILE)
+        self.embeddings_path = os.path.join(directory, EMBEDDINGS_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        os.makedirs(directory, exist_ok=True)
+
+    def _read_manifest(self) -> Optional[Dict]:
+        """Load the manifest, ignoring one written for a different model"""
+        if not os.path.exists(self.manifest_path) or not os.path.exists(self.embeddings_path):
+            return None
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading embedding manifest: {str(e)}")
+            return None
+        if manifest.get("model") != self.model_name:
+            return None
+        return manifest
+
+    def _write_manifest(self, manifest: Dict):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def encode(
+        self,
+        texts: List[str],
+        encoder: Callable[[List[str]], np.ndarray],
+        persist: bool = True
+    ) -> np.ndarray:
+        """Return embeddings for texts, calling encoder only for new or changed content.
+
+        New embeddings are appended to the store unless persist is False.
+        """
+        hashes = [content_hash(text) for text in texts]
+        if not hashes:
+            return np.zeros((0, 0), dtype="float32")
+        manifest = self._read_manifest()
+
+        cached_rows = {}
+        stored = None
+        if manifest:
+            stored = np.load(self.embeddings_path, mmap_mode="r")
+            cached_rows = {h: i for i, h in enumerate(manifest["hashes"])}
+
+        # Encode each missing content hash once
+        missing = {}
+        for text, h in zip(texts, hashes):
+            if h not in cached_rows and h not in missing:
+                missing[h] = text
+        new_embeddings = {}
+        if missing:
+            encoded = np.asarray(encoder(list(missing.values())), dtype="float32")
+            new_embeddings = dict(zip(missing.keys(), encoded))
+
+        embeddings = np.stack([
+            new_embeddings[h] if h in new_embeddings else np.asarray(stored[cached_rows[h]])
+            for h in hashes
+        ]).astype("float32")
+
+        if new_embeddings and persist:
+            # Append new rows; stale ones are dropped by prune()
+            new_rows = np.stack(list(new_embeddings.values()))
+            stored_hashes = manifest["hashes"] if manifest else []
+            matrix = np.concatenate([np.asarray(stored), new_rows]) if stored is not None else new_rows
+            # Release the memory map before the file is replaced
+            del stored
+            self._save_embeddings(matrix, stored_hashes + list(new_embeddings.keys()))
+
+        return embeddings
+
+    def prune(self, texts: List[str]):
+        """Drop stored embeddings whose content is no longer in the corpus"""
+        manifest = self._read_manifest()
+        if not manifest:
+            return
+        keep = {content_hash(text) for text in texts}
+        rows = [i for i, h in enumerate(manifest["hashes"]) if h in keep]
+        if len(rows) == len(manifest["hashes"]):
+            return
+        stored = np.load(self.embeddings_path, mmap_mode="r")
+        matrix = np.asarray(stored[rows])
+        del stored
+        self._save_embeddings(matrix, [manifest["hashes"][i] for i in rows])
+
+    def _save_embeddings(self, embeddings: np.ndarray, hashes: List[str]):
+        tmp_path = self.embeddings_path + ".tmp.npy"
+        np.save(tmp_path, embeddings)
+        os.replace(tmp_path, self.embeddings_path)
+        manifest = self._read_manifest() or {}
+        self._write_manifest({
+            "model": self.model_name,
+            "dimension": int(embeddings.shape[1]),
+            "hashes": hashes,
+            "index_hashes": manifest.get("index_hashes"),
+            "index_ids": manifest.get("index_ids"),
+            "index_factory": manifest.get("index_factory")
+        })
+
+    def load_index(self, texts: List[str], factory: str) -> Optional[Tuple[faiss.Index, List[int]]]:
+        """Load the saved index and its ids if it was built the same way from exactly these texts"""
+        manifest = self._read_manifest()
+        if not manifest or not os.path.exists(self.index_path):
+            return None
+        if manifest.get("index_ids") is None or manifest.get("index_factory") != factory:
+            return None
+        if manifest.get("index_hashes") != [content_hash(text) for text in texts]:
+            return None
+        try:
+            return faiss.read_index(self.index_path), manifest["index_ids"]
+        except RuntimeError as e:
+            print(f"Error reading FAISS index: {str(e)}")
+            return None
+
+    def save_index(self, index, texts: List[str], ids: List[int], factory: str):
+        """Persist the FAISS index and record how it was built and which texts and ids it covers"""
+        manifest = self._read_manifest()
+        if not manifest:
+            return
+        tmp_path = self.index_path + ".tmp"
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+        manifest["index_hashes"] = [content_hash(text) for text in texts]
+        manifest["index_ids"] = [int(i) for i in ids]
+        manifest["index_factory"] = factory
+        self._write_manifest(manifest)
@@ -0,0 +1,54 @@
+from typing import Any, Awaitable, Callable, List
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import os
+
+RAG_WORKERS = int(os.getenv('RAG_WORKERS', str(min(4, os.cpu_count() or 1))))
+RAG_MAX_PENDING = int(os.getenv('RAG_MAX_PENDING', '32'))
+
+class BoundedExecutor:
+    """Thread pool for CPU-bound work with a cap on in-flight tasks.
+
+    Embedding and FAISS search release the GIL, so threads spread them
+    across cores. Once max_pending tasks are queued or running, further
+    callers wait for a slot instead of growing the queue without bound.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = RAG_WORKERS,
+        max_pending: int = RAG_MAX_PENDING,
+        name: str = 'rag'
+    ):
+        if max_workers < 1 or max_pending < 1:
+            raise ValueError("max_workers and max_pending must be at least 1")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = asyncio.Semaphore(max_pending)
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn in the pool without blocking the event loop"""
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(fn, *args, **kwargs)
+            )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+async def gather_bounded(aws: List[Awaitable[Any]], limit: int) -> List[Any]:
+    """Await coroutines concurrently, at most limit at a time.
+
+    Results keep the input order and an exception is returned in place of
+    its result, so one failure does not cancel the others.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def bounded(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(bounded(aw) for aw in aws), return_exceptions=True)
@@ -0,0 +1,136 @@
+from typing import Dict, List
+from dataclasses import dataclass, replace
+import os
+import time
+import numpy as np
+import faiss
+
+INDEX_TYPES = ('flat', 'hnsw', 'ivfpq')
+
+@dataclass(frozen=True)
+class IndexConfig:
+    """How the RAG index is built and searched"""
+    index_type: str = 'flat'
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    nlist: int = 100
+    pq_m: int = 8
+    pq_bits: int = 8
+    nprobe: int = 10
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{self.index_type}'. Expected one of: {', '.join(INDEX_TYPES)}")
+
+    @classmethod
+    def from_env(cls) -> 'IndexConfig':
+        return cls(
+            index_type=os.getenv('RAG_INDEX_TYPE', 'flat').lower(),
+            hnsw_m=int(os.getenv('RAG_HNSW_M', '32')),
+            ef_construction=int(os.getenv('RAG_HNSW_EF_CONSTRUCTION', '200')),
+            ef_search=int(os.getenv('RAG_HNSW_EF_SEARCH', '64')),
+            nlist=int(os.getenv('RAG_IVF_NLIST', '100')),
+            pq_m=int(os.getenv('RAG_PQ_M', '8')),
+            pq_bits=int(os.getenv('RAG_PQ_BITS', '8')),
+            nprobe=int(os.getenv('RAG_IVF_NPROBE', '10'))
+        )
+
+    def factory_string(self) -> str:
+        """faiss.index_factory description of this config"""
+        if self.index_type == 'hnsw':
+            return f"IDMap,HNSW{self.hnsw_m}"
+        if self.index_type == 'ivfpq':
+            return f"IVF{self.nlist},PQ{self.pq_m}x{self.pq_bits}"
+        return "IDMap,Flat"
+
+    def min_training_size(self) -> int:
+        """Vectors needed to train the index, 0 if it needs no training"""
+        if self.index_type == 'ivfpq':
+            return max(self.nlist, 2 ** self.pq_bits)
+        return 0
+
+def resolve_config(config: IndexConfig, num_vectors: int) -> IndexConfig:
+    """Fall back to a flat index when there is too little data to train"""
+    if num_vectors < config.min_training_size():
+        return replace(config, index_type='flat')
+    return config
+
+def build_index(embeddings: np.ndarray, ids: np.ndarray, config: IndexConfig) -> faiss.Index:
+    """Create, train and fill an index for the given config"""
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    resolved = resolve_config(config, len(embeddings))
+    if resolved != config:
+        print(f"Only {len(embeddings)} vectors, too few to train {config.index_type}; using a flat index")
+        config = resolved
+
+    index = faiss.index_factory(embeddings.shape[1], config.factory_string())
+    if config.index_type == 'hnsw':
+        faiss.downcast_index(faiss.downcast_index(index).index).hnsw.efConstruction = config.ef_construction
+    if not index.is_trained:
+        index.train(embeddings)
+    index.add_with_ids(embeddings, np.asarray(ids, dtype='int64'))
+    configure_search(index, config)
+    return index
+
+def configure_search(index: faiss.Index, config: IndexConfig):
+    """Apply query-time parameters (efSearch, nprobe) to an index"""
+    params = faiss.ParameterSpace()
+    description = index_description(index)
+    if description == 'hnsw':
+        params.set_index_parameter(index, 'efSearch', config.ef_search)
+    elif description == 'ivfpq':
+        params.set_index_parameter(index, 'nprobe', config.nprobe)
+
+def index_description(index: faiss.Index) -> str:
+    """Index type of an existing index, as one of INDEX_TYPES"""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexHNSW):
+        return 'hnsw'
+    if isinstance(index, faiss.IndexIVF):
+        return 'ivfpq'
+    return 'flat'
+
+def supports_remove(index: faiss.Index) -> bool:
+    """HNSW graphs cannot drop vectors; they have to be rebuilt"""
+    return index_description(index) != 'hnsw'
+
+def recall_latency_report(
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    configs: List[IndexConfig],
+    k: int = 10
+) -> List[Dict]:
+    """Compare recall@k and query latency of each config against a flat index"""
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    ids = np.arange(len(embeddings), dtype='int64')
+    k = min(k, len(embeddings))
+
+    exact = build_index(embeddings, ids, IndexConfig(index_type='flat'))
+    _, truth = exact.search(queries, k)
+
+    report = []
+    for config in configs:
+        config = resolve_config(config, len(embeddings))
+        start = time.perf_counter()
+        index = build_index(embeddings, ids, config)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        query_seconds = time.perf_counter() - start
+
+        hits = sum(len(set(row_truth) & set(row_found)) for row_truth, row_found in zip(truth, found))
+        report.append({
+            "index_type": index_description(index),
+            "factory": config.factory_string(),
+            "ef_search": config.ef_search,
+            "nprobe": config.nprobe,
+            "recall_at_k": hits / float(len(queries) * k) if len(queries) else 0.0,
+            "avg_query_ms": 1000 * query_seconds / max(len(queries), 1),
+            "build_seconds": build_seconds
+        })
+    return report
@@ -0,0 +1,485 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.request import pathname2url
+import multiprocessing
+import os
+import sqlite3
+import threading
+
+CSV_CHUNK_SIZE = int(os.getenv('CSV_CHUNK_SIZE', '10000'))
+SQLITE_FETCH_SIZE = int(os.getenv('SQLITE_FETCH_SIZE', '1000'))
+PDF_PAGE_WORKERS = int(os.getenv('PDF_PAGE_WORKERS', '0')) or None  # None uses every core
+PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', '8'))
+PREVIEW_CHARS = 1000
+HTML_PARSER = os.getenv('HTML_PARSER', 'auto')  # auto, lxml, bs4
+HTML_PREVIEW_CHARS = 500
+REQUIRED_CSV_COLUMNS = ['title', 'description', 'assignedTo']
+OPTIONAL_CSV_COLUMNS = ['deadline', 'priority', 'status', 'tags']
+DEFAULT_DEADLINE = "2023-12-31"
+
+def missing_csv_columns(file_path: str) -> List[str]:
+    """Required job columns absent from the CSV header"""
+    import pandas as pd
+
+    header = pd.read_csv(file_path, nrows=0).columns
+    return [col for col in REQUIRED_CSV_COLUMNS if col not in header]
+
+def iter_csv_jobs(file_path: str, chunksize: int = CSV_CHUNK_SIZE) -> Iterator[Dict]:
+    """Yield jobs from a CSV, reading and converting it one chunk at a time"""
+    import pandas as pd
+
+    header = pd.read_csv(file_path, nrows=0).columns
+    usecols = [col for col in REQUIRED_CSV_COLUMNS + OPTIONAL_CSV_COLUMNS if col in header]
+    source_document = os.path.basename(file_path)
+
+    # Object dtype keeps every chunk's values as read; per-chunk inference could
+    # turn the same column into 1.0 in one chunk and 3 in the next
+    for chunk in pd.read_csv(file_path, usecols=usecols, chunksize=chunksize, dtype=object):
+        # Build each column at once; missing values become None
+        frame = chunk.astype(object).where(chunk.notna(), None)
+        if 'deadline' not in frame:
+            frame['deadline'] = DEFAULT_DEADLINE
+        frame['sourceDocument'] = source_document
+
+        has_tags = 'tags' in frame
+        if has_tags:
+            # Split only the rows that have tags; an all-empty chunk would otherwise
+            # carry string or float placeholders for the missing values
+            tags = chunk['tags']
+            tags = tags[tags.notna()]
+            frame['tags'] = (
+                tags.astype(str).str.strip().str.split(r'\s*,\s*', regex=True)
+                .reindex(frame.index)
+            )
+
+        for job in frame.to_dict('records'):
+            if has_tags and not isinstance(job['tags'], list):
+                del job['tags']
+            yield job
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _connect_read_only(file_path: str) -> sqlite3.Connection:
+    """Open an uploaded database without any chance of writing to it"""
+    uri = f"file:{pathname2url(os.path.abspath(file_path))}?mode=ro"
+    # Job iterators may be resumed from different worker threads
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+def _map_job_columns(column_names: List[str]) -> Dict[str, str]:
+    """Map job fields to the table columns that hold them"""
+    column_mapping = {}
+    for col in column_names:
+        name = col.lower()
+        if 'title' in name:
+            column_mapping['title'] = col
+        elif 'desc' in name:
+            column_mapping['description'] = col
+        elif 'assign' in name:
+            column_mapping['assignedTo'] = col
+        elif 'dead' in name or 'due' in name:
+            column_mapping['deadline'] = col
+        elif 'prior' in name:
+            column_mapping['priority'] = col
+        elif 'status' in name:
+            column_mapping['status'] = col
+        elif 'tag' in name:
+            column_mapping['tags'] = col
+    return column_mapping
+
+def find_sqlite_job_tables(file_path: str) -> List[Tuple[str, Dict[str, str]]]:
+    """Tables that look like they hold jobs, with their column mapping"""
+    conn = _connect_read_only(file_path)
+    try:
+        tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()
+
+        job_tables = []
+        for (table_name,) in tables:
+            columns = conn.execute(f"PRAGMA table_info({_quote_identifier(table_name)});").fetchall()
+            column_names = [col[1] for col in columns]
+
+            # Table likely contains job data if it matches at least 2 columns
+            job_columns = ['title', 'description', 'assigned']
+            matches = sum(1 for col in job_columns if any(col in name.lower() for name in column_names))
+            if matches >= 2:
+                job_tables.append((table_name, _map_job_columns(column_names)))
+        return job_tables
+    finally:
+        conn.close()
+
+def iter_sqlite_jobs(
+    file_path: str,
+    job_tables: Optional[List[Tuple[str, Dict[str, str]]]] = None,
+    fetch_size: int = SQLITE_FETCH_SIZE
+) -> Iterator[Dict]:
+    """Yield every job row from the job tables, fetching a page of rows at a time"""
+    if job_tables is None:
+        job_tables = find_sqlite_job_tables(file_path)
+    source_document = os.path.basename(file_path)
+
+    conn = _connect_read_only(file_path)
+    try:
+        for table_name, column_mapping in job_tables:
+            if 'title' not in column_mapping or 'description' not in column_mapping:
+                continue  # Skip tables without basic required fields
+
+            # Select only the mapped columns
+            fields = list(column_mapping.keys())
+            select_list = ", ".join(_quote_identifier(column_mapping[field]) for field in fields)
+            cursor = conn.execute(f"SELECT {select_list} FROM {_quote_identifier(table_name)};")
+
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    values = dict(zip(fields, row))
+                    job = {
+                        'title': values['title'],
+                        'description': values['description'],
+                        'assignedTo': values.get('assignedTo', "Unassigned"),
+                        'deadline': values.get('deadline', DEFAULT_DEADLINE),
+                        'sourceDocument': source_document
+                    }
+
+                    if 'priority' in values:
+                        job['priority'] = values['priority']
+                    if 'status' in values:
+                        job['status'] = values['status']
+                    if values.get('tags'):
+                        job['tags'] = [tag.strip() for tag in str(values['tags']).split(',')]
+
+                    yield job
+    finally:
+        conn.close()
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+def _pool_context():
+    # Forking a process that already runs thread pools (and torch/FAISS threads) is unsafe
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Process pool shared by CPU-heavy document and corpus extraction"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=PDF_PAGE_WORKERS, mp_context=_pool_context())
+        return _process_pool
+
+def _discard_process_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next caller gets a fresh one"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _looks_like_title(line: str) -> bool:
+    """Short line with capitalized words"""
+    return len(line) < 100 and any(word[0].isupper() for word in line.split() if word)
+
+def _classify_pdf_pages(file_path: str, start: int, stop: int) -> List[Tuple[List[str], List[bool]]]:
+    """Extract the lines of pages [start, stop) and flag the ones that look like titles"""
+    import fitz  # PyMuPDF
+
+    pages = []
+    with fitz.open(file_path) as doc:
+        for page_number in range(start, stop):
+            lines = doc[page_number].get_text().split('\n')
+            pages.append((lines, [_looks_like_title(line.strip()) for line in lines]))
+    return pages
+
+def map_in_process_pool(fn, *iterables) -> list:
+    """map() over the shared pool, replacing it once if a crashed worker broke it"""
+    for attempt in range(2):
+        pool = get_process_pool()
+        try:
+            return list(pool.map(fn, *iterables))
+        except BrokenProcessPool:
+            _discard_process_pool(pool)
+            if attempt == 1:
+                raise
+
+def extract_pdf_lines(file_path: str) -> Tuple[List[str], List[bool]]:
+    """Lines of a PDF and their title flags, extracted page range by page range in parallel"""
+    import fitz  # PyMuPDF
+
+    with fitz.open(file_path) as doc:
+        page_count = doc.page_count
+
+    starts = list(range(0, page_count, PDF_PAGES_PER_TASK))
+    stops = [min(start + PDF_PAGES_PER_TASK, page_count) for start in starts]
+    if len(starts) <= 1:
+        chunks = [_classify_pdf_pages(file_path, start, stop) for start, stop in zip(starts, stops)]
+    else:
+        chunks = map_in_process_pool(_classify_pdf_pages, [file_path] * len(starts), starts, stops)
+
+    # Merge in page order; a page break counts as a line break
+    lines = []
+    title_flags = []
+    for chunk in chunks:
+        for page_lines, page_flags in chunk:
+            lines.extend(page_lines)
+            title_flags.extend(page_flags)
+    return lines, title_flags
+
+def extract_pdf_jobs(file_path: str) -> Tuple[List[Dict], str]:
+    """Jobs found in a PDF, plus a preview of its text for when none are found"""
+    lines, title_flags = extract_pdf_lines(file_path)
+    source_document = os.path.basename(file_path)
+
+    # Look for job-like sections in the text
+    job_candidates = []
+    current_job = None
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+
+        # Check if this line looks like a job title (short line with capitalized words)
+        if title_flags[i]:
+            # If we were building a job, save it
+            if current_job and 'description' in current_job:
+                job_candidates.append(current_job)
+
+            # Start a new job
+            current_job = {
+                'title': line,
+                'sourceDocument': source_document
+            }
+        elif current_job and 'description' not in current_job:
+            # Add the first non-title line as description
+            current_job['description'] = line
+
+            # Look for assignee information in nearby lines
+            for j in range(i+1, min(i+10, len(lines))):
+                if 'assign' in lines[j].lower() or 'responsible' in lines[j].lower():
+                    parts = lines[j].strip().split(':')
+                    if len(parts) > 1:
+                        current_job['assignedTo'] = parts[1].strip()
+                        break
+
+            # If no assignee found, use a default
+            if 'assignedTo' not in current_job:
+                current_job['assignedTo'] = "Unassigned"
+
+            # Look for deadline information
+            for j in range(i+1, min(i+10, len(lines))):
+                if any(term in lines[j].lower() for term in ['deadline', 'due date', 'due by']):
+                    current_job['deadline'] = lines[j].strip().split(':')[-1].strip()
+                    break
+
+            # If no deadline found, use a default
+            if 'deadline' not in current_job:
+                current_job['deadline'] = DEFAULT_DEADLINE
+
+    # Save the last job if we were building one
+    if current_job and 'description' in current_job:
+        job_candidates.append(current_job)
+
+    # Clean up jobs (ensure they have all required fields and reasonable content)
+    jobs = [
+        job for job in job_candidates
+        if len(job['title']) > 5 and len(job['description']) > 10
+    ]
+
+    text_content = "\n".join(lines)
+    preview = text_content[:PREVIEW_CHARS] + "..." if len(text_content) > PREVIEW_CHARS else text_content
+    return jobs, preview
+
+# HTML job extraction
+
+JOB_CONTAINER_CLASSES = {'job', 'card', 'listing'}
+TITLE_TAGS = {'h1', 'h2', 'h3', 'h4'}
+HEADER_TAGS = {'h1', 'h2', 'h3'}
+
+def _html_job(title: str, description: str, source_document: str,
+              assignee: str = "Unassigned", deadline: str = DEFAULT_DEADLINE) -> Dict:
+    return {
+        'title': title,
+        'description': description,
+        'assignedTo': assignee,
+        'deadline': deadline,
+        'sourceDocument': source_document
+    }
+
+def _classes(elem) -> set:
+    return set((elem.get('class') or '').split())
+
+def _is_job_container(elem) -> bool:
+    """Matches 'div.job, article, section, .card, .listing'"""
+    classes = _classes(elem)
+    return (
+        elem.tag in ('article', 'section')
+        or (elem.tag == 'div' and 'job' in classes)
+        or bool(classes & {'card', 'listing'})
+    )
+
+def _find_descendant(elem, tags=(), classes=()):
+    """First descendant in document order with one of the tags or classes"""
+    for node in elem.iterdescendants():
+        if not isinstance(node.tag, str):
+            continue  # Comments and processing instructions
+        if node.tag in tags or _classes(node) & set(classes):
+            return node
+    return None
+
+def _text(elem) -> str:
+    return "".join(elem.itertext()).strip() if elem is not None else ""
+
+def _container_job(container, source_document: str) -> Optional[Dict]:
+    title_elem = _find_descendant(container, TITLE_TAGS, ('title', 'job-title'))
+    if title_elem is None:
+        return None
+    desc_elem = _find_descendant(container, ('p',), ('description', 'job-description'))
+    assignee_elem = _find_descendant(container, classes=('assignee', 'assigned-to'))
+    deadline_elem = _find_descendant(container, classes=('deadline', 'due-date'))
+    return _html_job(
+        _text(title_elem),
+        _text(desc_elem),
+        source_document,
+        _text(assignee_elem) if assignee_elem is not None else "Unassigned",
+        _text(deadline_elem) if deadline_elem is not None else DEFAULT_DEADLINE
+    )
+
+def _extract_html_jobs_lxml(file_path: str) -> Tuple[List[Dict], Optional[str], str]:
+    """Single streaming pass with lxml iterparse; finished subtrees are freed as we go.
+
+    Container jobs and header/paragraph jobs are collected together; the
+    header jobs are only used when the page has no job containers.
+    """
+    from lxml import etree
+
+    source_document = os.path.basename(file_path)
+    container_jobs = []
+    header_jobs = []
+    pending_titles = []  # Headers still waiting for the next paragraph
+    found_container = False
+    container_depth = 0
+    page_title = None
+    preview = []
+    preview_len = 0
+
+    for event, elem in etree.iterparse(
+        file_path, events=('start', 'end'), html=True, encoding='utf-8', huge_tree=True
+    ):
+        if not isinstance(elem.tag, str):
+            continue
+        if event == 'start':
+            if _is_job_container(elem):
+                container_depth += 1
+                found_container = True
+            continue
+
+        if preview_len < HTML_PREVIEW_CHARS and elem.text:
+            preview.append(elem.text)
+            preview_len += len(elem.text)
+        if elem.tag == 'title' and page_title is None:
+            page_title = elem.text
+
+        if _is_job_container(elem):
+            container_depth -= 1
+            if container_depth > 0:
+                continue  # Handled with its outermost container
+            # Nested containers count too, in document order
+            for node in elem.iter():
+                if isinstance(node.tag, str) and _is_job_container(node):
+                    job = _container_job(node, source_document)
+                    if job:
+                        container_jobs.append(job)
+        elif container_depth > 0:
+            continue  # Keep the subtree until its container is done
+        elif not found_container:
+            if elem.tag in HEADER_TAGS:
+                title = _text(elem)
+                if 5 < len(title) < 100:  # Reasonable title length
+                    pending_titles.append(title)
+            elif elem.tag == 'p' and pending_titles:
+                description = _text(elem)
+                if len(description) > 10:
+                    header_jobs.extend(
+                        _html_job(title, description, source_document) for title in pending_titles
+                    )
+                pending_titles = []
+
+        # Free the finished subtree and anything before it
+        elem.clear(keep_tail=True)
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+    jobs = container_jobs if found_container else header_jobs
+    return jobs, page_title, "".join(preview)[:HTML_PREVIEW_CHARS]
+
+def _extract_html_jobs_bs4(file_path: str) -> Tuple[List[Dict], Optional[str], str]:
+    """Whole-document BeautifulSoup extraction, used when lxml is not installed"""
+    from bs4 import BeautifulSoup
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f, 'html.parser')
+
+    source_document = os.path.basename(file_path)
+    jobs = []
+
+    # Look for job listings in common container elements
+    job_containers = soup.select('div.job, article, section, .card, .listing')
+
+    if not job_containers:
+        # If no specific containers found, try headers as job titles
+        for header in soup.select('h1, h2, h3'):
+            title = header.get_text().strip()
+            if 5 < len(title) < 100:  # Reasonable title length
+                # Look for description in the next paragraph
+                desc_elem = header.find_next('p')
+                description = desc_elem.get_text().strip() if desc_elem else ""
+                if len(description) > 10:
+                    jobs.append(_html_job(title, description, source_document))
+    else:
+        for container in job_containers:
+            title_elem = container.select_one('h1, h2, h3, h4, .title, .job-title')
+            if not title_elem:
+                continue
+            desc_elem = container.select_one('p, .description, .job-description')
+            assignee_elem = container.select_one('.assignee, .assigned-to')
+            deadline_elem = container.select_one('.deadline, .due-date')
+            jobs.append(_html_job(
+                title_elem.get_text().strip(),
+                desc_elem.get_text().strip() if desc_elem else "",
+                source_document,
+                assignee_elem.get_text().strip() if assignee_elem else "Unassigned",
+                deadline_elem.get_text().strip() if deadline_elem else DEFAULT_DEADLINE
+            ))
+
+    page_title = soup.title.string if soup.title else None
+    return jobs, page_title, soup.get_text()[:HTML_PREVIEW_CHARS]
+
+HTML_BACKENDS = {
+    'lxml': _extract_html_jobs_lxml,
+    'bs4': _extract_html_jobs_bs4,
+}
+
+def html_backend(name: str = HTML_PARSER) -> str:
+    """Backend to use: the configured one, or lxml when it is installed"""
+    if name != 'auto':
+        if name not in HTML_BACKENDS:
+            raise ValueError(f"Unknown HTML parser backend: {name}")
+        return name
+    try:
+        import lxml  # noqa: F401
+        return 'lxml'
+    except ImportError:
+        return 'bs4'
+
+def extract_html_jobs(file_path: str, backend: str = HTML_PARSER) -> Tuple[List[Dict], Optional[str], str]:
+    """Jobs found in an HTML file, plus the page title and a text preview for when none are found"""
+    return HTML_BACKENDS[html_backend(backend)](file_path)
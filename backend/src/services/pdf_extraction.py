@@ -0,0 +1,77 @@
+from typing import Dict, List, Optional
+import hashlib
+import os
+from .job_extraction import map_in_process_pool
+
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', 'database/pdf_cache')
+
+def extract_pdf_text(file_path: str) -> str:
+    """Extract the text of every page of a PDF"""
+    import fitz  # PyMuPDF
+
+    with fitz.open(file_path) as doc:
+        return "\n".join(page.get_text() for page in doc)
+
+class PDFTextCache:
+    """Extracted PDF text cached per file on (path, mtime, size)"""
+
+    def __init__(self, directory: str = PDF_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _cache_path(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        key = f"{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + ".txt")
+
+    def get(self, file_path: str) -> Optional[str]:
+        cache_path = self._cache_path(file_path)
+        if not os.path.exists(cache_path):
+            return None
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def set(self, file_path: str, text: str):
+        cache_path = self._cache_path(file_path)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, cache_path)
+
+def extract_pdf_texts(
+    file_paths: List[str],
+    cache: Optional[PDFTextCache] = None
+) -> Dict[str, str]:
+    """Extract text from many PDFs, parsing uncached files in the shared process pool"""
+    cache = cache or PDFTextCache()
+    texts = {}
+    missing = []
+    for file_path in file_paths:
+        cached = cache.get(file_path)
+        if cached is not None:
+            texts[file_path] = cached
+        else:
+            missing.append(file_path)
+
+    if not missing:
+        return texts
+
+    if len(missing) == 1:
+        results = [_safe_extract(missing[0])]
+    else:
+        results = map_in_process_pool(_safe_extract, missing)
+
+    for file_path, text in zip(missing, results):
+        if text is None:
+            continue
+        cache.set(file_path, text)
+        texts[file_path] = text
+
+    return texts
+
+def _safe_extract(file_path: str) -> Optional[str]:
+    try:
+        return extract_pdf_text(file_path)
+    except Exception as e:
+        print(f"Error extracting PDF {file_path}: {str(e)}")
+        return None
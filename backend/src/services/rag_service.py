@@ -1,12 +1,35 @@
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass, field, replace
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import faiss
 import json
 import os
+import threading
 from .web_search import WebSearchService
+from .embedding_store import EmbeddingStore
+from .embedding_models import model_registry
+from .chunking import Chunk, chunk_text
+from .executor import BoundedExecutor, gather_bounded
+from .result_cache import TTLCache
+from .single_flight import SingleFlight
+from .index_factory import (
+    IndexConfig,
+    build_index,
+    configure_search,
+    index_description,
+    recall_latency_report,
+    resolve_config,
+    supports_remove
+)
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+INDEX_DIR = os.getenv('RAG_INDEX_DIR', 'database/rag_index')
+RESULT_CACHE_SIZE = int(os.getenv('RAG_CACHE_SIZE', '1024'))
+RESULT_CACHE_TTL = float(os.getenv('RAG_CACHE_TTL', '3600'))
+WEB_SEARCH_CONCURRENCY = int(os.getenv('RAG_WEB_SEARCH_CONCURRENCY', '8'))
+# Noise added to sampled passages, relative to their norm, to form report queries
+REPORT_QUERY_NOISE = float(os.getenv('RAG_REPORT_QUERY_NOISE', '0.5'))
 
 @dataclass
 class RAGResult:
@@ -15,27 +38,86 @@ class RAGResult:
     confidence_score: float
     knowledge_sources: List[str]
     article_references: List[Dict[str, str]] = None
+    # Built without the web results it needed, so it must not be cached
+    web_search_failed: bool = field(default=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.article_references is None:
             self.article_references = []
 
+@dataclass(frozen=True)
+class Passage:
+    """A chunk of a document as stored in the index"""
+    document: Dict
+    chunk: Chunk
+
+@dataclass(frozen=True)
+class _IndexSnapshot:
+    """Immutable view of the index and the passages behind its ids"""
+    index: Optional[faiss.Index]
+    passages: Dict[int, Passage]
+    version: int = 0
+
+def normalize_query(text: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of a query used for caching"""
+    return " ".join((text or "").lower().split())
+
+def document_key(doc: Dict) -> str:
+    """Identifier used to add and remove a document"""
+    return doc.get('id') or doc.get('source') or doc.get('name', '')
+
 class RAGService:
-    def __init__(self, articles=None):
-        # Initialize the sentence transformer model
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(
+        self,
+        articles=None,
+        index_dir: Optional[str] = None,
+        model_name: str = MODEL_NAME,
+        index_config: Optional[IndexConfig] = None,
+        executor: Optional[BoundedExecutor] = None,
+        web_search: Optional[WebSearchService] = None
+    ):
+        # The sentence transformer is shared and loaded on first use
+        self.model_name = model_name
         
-        # Initialize FAISS index
-        self.index = None
-        self.documents = articles or []
-        self.web_search = WebSearchService()
+        # Initialize FAISS index and its on-disk embedding store
+        self.store = EmbeddingStore(index_dir or INDEX_DIR, model_name)
+        self.index_config = index_config or IndexConfig.from_env()
+
+        # Embedding and search run off the event loop in a bounded pool
+        self.executor = executor or BoundedExecutor()
+
+        # Results keyed on normalized (query, context) and corpus version
+        self.result_cache = TTLCache(max_size=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+        # Concurrent lookups of the same key share one retrieval
+        self._inflight = SingleFlight()
+        self.web_search = web_search or WebSearchService()
+
+        # Queries read the current snapshot, writers swap in a new one
+        self._snapshot = _IndexSnapshot(index=None, passages={})
+        self._write_lock = threading.Lock()
+        self._next_id = 0
         
         # Load knowledge base if no articles provided
-        if not self.documents:
+        if not articles:
             self._load_knowledge_base()
         else:
             # Create embeddings and index for provided articles
-            self._index_documents()
+            self._index_documents(list(articles))
+
+    @property
+    def model(self):
+        return model_registry.get(self.model_name)
+
+    @property
+    def index(self) -> Optional[faiss.Index]:
+        return self._snapshot.index
+
+    @property
+    def documents(self) -> List[Dict]:
+        unique = {}
+        for passage in self._snapshot.passages.values():
+            unique.setdefault(id(passage.document), passage.document)
+        return list(unique.values())
 
     def _load_knowledge_base(self):
         """Load and index the knowledge base"""
@@ -45,40 +127,157 @@ class RAGService:
             return
 
         # Load all JSON files from knowledge base
+        documents = []
         for filename in os.listdir(knowledge_dir):
             if filename.endswith('.json'):
                 with open(os.path.join(knowledge_dir, filename), 'r') as f:
                     data = json.load(f)
-                    self.documents.extend(data)
+                    documents.extend(data)
 
-        if not self.documents:
-            return
+        self._index_documents(documents)
 
-        # Create embeddings for all documents
-        texts = [doc.get('content', '') for doc in self.documents]
-        embeddings = self.model.encode(texts)
-        
-        # Initialize FAISS index
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(embeddings.astype('float32'))
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts)
 
-    def _index_documents(self):
+    def _chunk_documents(self, documents: List[Dict]) -> List[Passage]:
+        """Split documents into the passages that get embedded"""
+        return [
+            Passage(document=doc, chunk=chunk)
+            for doc in documents
+            for chunk in chunk_text(doc.get('content', ''))
+        ]
+
+    def _index_documents(self, documents: List[Dict]):
         """Create embeddings and index for documents"""
-        if not self.documents:
+        passages = self._chunk_documents(documents)
+        if not passages:
             return
             
-        # Create embeddings for all documents
-        texts = [doc.get('content', '') for doc in self.documents]
-        if not texts:
+        # Create embeddings for all passages
+        texts = [passage.chunk.text for passage in passages]
+
+        with self._write_lock:
+            # Reuse the persisted index when the corpus and index type are unchanged
+            factory = resolve_config(self.index_config, len(texts)).factory_string()
+            loaded = self.store.load_index(texts, factory)
+            if loaded is not None:
+                index, ids = loaded
+                configure_search(index, self.index_config)
+                # Drop rows left behind by edits made before the last shutdown
+                self.store.prune(texts)
+            else:
+                # Only new or changed passages are encoded, the rest come from disk
+                embeddings = self.store.encode(texts, self._encode)
+                self.store.prune(texts)
+
+                ids = list(range(len(passages)))
+                index = build_index(embeddings, ids, self.index_config)
+                self.store.save_index(index, texts, ids, factory)
+
+            self._next_id = max(ids) + 1
+            self._snapshot = _IndexSnapshot(
+                index=index,
+                passages=dict(zip(ids, passages)),
+                version=self._snapshot.version + 1
+            )
+            self.result_cache.clear()
+
+    def add_documents(self, documents: List[Dict]):
+        """Embed and add documents without rebuilding the index"""
+        passages = self._chunk_documents(documents)
+        if not passages:
             return
-            
-        embeddings = self.model.encode(texts)
-        
-        # Initialize FAISS index
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(embeddings.astype('float32'))
+
+        texts = [passage.chunk.text for passage in passages]
+        with self._write_lock:
+            embeddings = self.store.encode(texts, self._encode)
+            snapshot = self._snapshot
+
+            # Copy on write so in-flight queries keep their snapshot
+            ids = list(range(self._next_id, self._next_id + len(passages)))
+            if snapshot.index is not None:
+                index = faiss.clone_index(snapshot.index)
+                configure_search(index, self.index_config)
+                index.add_with_ids(embeddings, np.asarray(ids, dtype='int64'))
+            else:
+                index = build_index(embeddings, ids, self.index_config)
+
+            self._next_id += len(passages)
+            self._publish(_IndexSnapshot(
+                index=index,
+                passages={**snapshot.passages, **dict(zip(ids, passages))},
+                version=snapshot.version + 1
+            ))
+
+    def remove_document(self, doc_id: str) -> bool:
+        """Remove a document from the index by its id or source"""
+        with self._write_lock:
+            snapshot = self._snapshot
+            ids = [
+                i for i, passage in snapshot.passages.items()
+                if document_key(passage.document) == doc_id
+            ]
+            if not ids:
+                return False
+
+            removed = set(ids)
+            passages = {i: p for i, p in snapshot.passages.items() if i not in removed}
+            if not passages:
+                index = None
+            elif supports_remove(snapshot.index):
+                index = faiss.clone_index(snapshot.index)
+                configure_search(index, self.index_config)
+                index.remove_ids(np.asarray(ids, dtype='int64'))
+            else:
+                # Rebuild from stored embeddings; nothing is re-encoded
+                embeddings = self.store.encode(
+                    [p.chunk.text for p in passages.values()], self._encode
+                )
+                index = build_index(embeddings, list(passages.keys()), self.index_config)
+
+            self._publish(_IndexSnapshot(index=index, passages=passages, version=snapshot.version + 1))
+            return True
+
+    def _publish(self, snapshot: _IndexSnapshot):
+        """Swap in a new snapshot, drop cached results and persist it"""
+        self._snapshot = snapshot
+        self.result_cache.clear()
+        texts = [passage.chunk.text for passage in snapshot.passages.values()]
+        # Keep only the embeddings still indexed so edits don't grow the store
+        self.store.prune(texts)
+        if snapshot.index is None:
+            return
+        # Record the type actually built, which may be flat for a small corpus
+        factory = replace(self.index_config, index_type=index_description(snapshot.index)).factory_string()
+        self.store.save_index(snapshot.index, texts, list(snapshot.passages.keys()), factory)
+
+    def index_report(self, num_queries: int = 100, k: int = 10) -> List[Dict]:
+        """Recall and latency of each index type against flat search on this corpus.
+
+        Builds every index type, so call it through the executor.
+        """
+        with self._write_lock:
+            # Read-only: writers may be rewriting the store at the same time
+            passages = list(self._snapshot.passages.values())
+            if not passages:
+                return []
+            embeddings = self.store.encode([p.chunk.text for p in passages], self._encode, persist=False)
+
+        # Queries are perturbed copies of sampled passages, so none is an exact
+        # match for an indexed vector that would find itself
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(embeddings), size=min(num_queries, len(embeddings)), replace=False)
+        queries = embeddings[sample]
+        noise = rng.standard_normal(queries.shape).astype('float32')
+        noise *= REPORT_QUERY_NOISE * (
+            np.linalg.norm(queries, axis=1, keepdims=True) / np.linalg.norm(noise, axis=1, keepdims=True)
+        )
+
+        configs = [
+            replace(self.index_config, index_type=index_type)
+            for index_type in ('flat', 'hnsw', 'ivfpq')
+        ]
+        return recall_latency_report(embeddings, queries + noise, configs, k)
 
     async def retrieve_relevant_info(
         self,
@@ -86,33 +285,127 @@ class RAGService:
         context: Optional[str] = None
     ) -> RAGResult:
         """Retrieve relevant information using RAG"""
-        # If no knowledge base, fall back to web search
-        if not self.index or not self.documents:
-            web_results = await self.web_search.search_job_info(query, context)
-            return self._create_result_from_web(web_results)
+        results = await self.retrieve_relevant_info_batch([query], [context])
+        return results[0]
 
-        # Get query embedding
-        query_embedding = self.model.encode([query])[0]
-        
-        # Search in knowledge base
-        k = min(3, len(self.documents))  # Get top 3 results
-        distances, indices = self.index.search(
-            query_embedding.reshape(1, -1).astype('float32'), k
+    async def retrieve_relevant_info_batch(
+        self,
+        queries: List[str],
+        contexts: Optional[List[Optional[str]]] = None,
+        return_exceptions: bool = False
+    ) -> List[Union[RAGResult, BaseException]]:
+        """Retrieve relevant information for many queries with one encode and one search.
+
+        Results keep the order of queries. With return_exceptions=True a
+        failed lookup is returned in its slot instead of failing the batch.
+        """
+        if not queries:
+            return []
+        contexts = contexts or [None] * len(queries)
+        snapshot = self._snapshot
+
+        # Serve repeated queries from the cache, looking up each distinct miss once
+        keys = [
+            (normalize_query(query), normalize_query(context), snapshot.version)
+            for query, context in zip(queries, contexts)
+        ]
+        cached = {}
+        misses = {}
+        for key, query, context in zip(keys, queries, contexts):
+            if key in cached or key in misses:
+                continue
+            result = self.result_cache.get(key)
+            if result is not None:
+                cached[key] = result
+            else:
+                misses[key] = (query, context)
+
+        if misses:
+            async def retrieve(keys):
+                fresh = await self._retrieve_uncached(
+                    snapshot,
+                    [misses[key][0] for key in keys],
+                    [misses[key][1] for key in keys]
+                )
+                for key, result in zip(keys, fresh):
+                    if not isinstance(result, BaseException) and not result.web_search_failed:
+                        self.result_cache.set(key, result)
+                return fresh
+
+            # Keys already being looked up by another request are awaited, not repeated
+            miss_keys = list(misses.keys())
+            for key, result in zip(miss_keys, await self._inflight.do_many(miss_keys, retrieve)):
+                cached[key] = result
+
+        results = [cached[key] for key in keys]
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        return results
+
+    async def _retrieve_uncached(
+        self,
+        snapshot: _IndexSnapshot,
+        queries: List[str],
+        contexts: List[Optional[str]]
+    ) -> List[Union[RAGResult, BaseException]]:
+        """Run retrieval against a snapshot, falling back to web search.
+
+        Web searches for low-confidence queries run concurrently, bounded by
+        WEB_SEARCH_CONCURRENCY; a failed query yields its exception.
+        """
+        if snapshot.index is None or not snapshot.passages:
+            matches = [None] * len(queries)
+        else:
+            try:
+                matches = await self.executor.run(self._search, snapshot, queries)
+            except Exception as e:
+                return [e] * len(queries)
+
+        async def finish(query, context, match):
+            # If no knowledge base, fall back to web search
+            if match is None:
+                web_results = await self.web_search.lookup_job_info(query, context)
+                result = self._create_result_from_web(web_results or [])
+            else:
+                # If confidence is low, enhance with web search
+                relevant_passages, confidence = match
+                if confidence >= 0.6:
+                    return self._create_result_from_passages(relevant_passages, confidence)
+                web_results = await self.web_search.lookup_job_info(query, context)
+                result = self._combine_knowledge(relevant_passages, web_results or [], confidence)
+            # A failed search is served as-is but retried on the next lookup
+            result.web_search_failed = web_results is None
+            return result
+
+        return await gather_bounded(
+            [finish(query, context, match) for query, context, match in zip(queries, contexts, matches)],
+            limit=WEB_SEARCH_CONCURRENCY
         )
 
-        # Get relevant documents
-        relevant_docs = [self.documents[i] for i in indices[0]]
-        
-        # Calculate confidence score
-        confidence = 1 - (distances[0][0] / 2)  # Normalize distance to confidence
-        confidence = max(0, min(1, confidence))
-
-        # If confidence is low, enhance with web search
-        if confidence < 0.6:
-            web_results = await self.web_search.search_job_info(query, context)
-            return self._combine_knowledge(relevant_docs, web_results, confidence)
+    def _search(
+        self,
+        snapshot: _IndexSnapshot,
+        queries: List[str]
+    ) -> List[Tuple[List[Passage], float]]:
+        """Embed all queries in one pass and run a single multi-query search"""
+        query_embeddings = np.asarray(self.model.encode(queries), dtype='float32')
         
-        return self._create_result_from_docs(relevant_docs, confidence)
+        # Search in knowledge base
+        k = min(3, len(snapshot.passages))  # Get top 3 passages per query
+        distances, indices = snapshot.index.search(query_embeddings, k)
+
+        matches = []
+        for row_distances, row_indices in zip(distances, indices):
+            # Get relevant passages
+            relevant_passages = [snapshot.passages[i] for i in row_indices if i in snapshot.passages]
+
+            # Calculate confidence score
+            confidence = 1 - (float(row_distances[0]) / 2)  # Normalize distance to confidence
+            confidence = max(0, min(1, confidence))
+            matches.append((relevant_passages, confidence))
+        return matches
 
     async def combine_knowledge(
         self,
@@ -141,14 +434,16 @@ class RAGService:
             knowledge_sources=rag_results.knowledge_sources + ["web_search"]
         )
 
-    def _create_result_from_docs(
+    def _create_result_from_passages(
         self,
-        docs: List[Dict],
+        passages: List[Passage],
         confidence: float
     ) -> RAGResult:
-        """Create RAGResult from knowledge base documents"""
-        combined_desc = "\n".join(doc.get('content', '') for doc in docs)
-        sources = [doc.get('source', 'knowledge_base') for doc in docs]
+        """Create RAGResult from the matching knowledge base passages"""
+        combined_desc = "\n".join(passage.chunk.text for passage in passages)
+        sources = list(dict.fromkeys(
+            passage.document.get('source', 'knowledge_base') for passage in passages
+        ))
 
         return RAGResult(
             enhanced_description=combined_desc,
@@ -180,13 +475,13 @@ class RAGService:
 
     def _combine_knowledge(
         self,
-        docs: List[Dict],
+        passages: List[Passage],
         web_results: List[Dict[str, str]],
         confidence: float
     ) -> RAGResult:
         """Combine knowledge base and web results"""
         # Create base result from knowledge base
-        base_result = self._create_result_from_docs(docs, confidence)
+        base_result = self._create_result_from_passages(passages, confidence)
         
         # Add web results
         combined_desc = f"{base_result.enhanced_description}\n\nAdditional Information:\n"
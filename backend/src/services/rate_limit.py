@@ -0,0 +1,134 @@
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import asyncio
+import os
+import random
+import time
+import aiohttp
+
+T = TypeVar('T')
+
+# Statuses worth retrying: rate limited or a transient upstream failure
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class RetryableStatus(Exception):
+    """Raised by a request function when the upstream asks us to retry"""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None, detail: str = ""):
+        super().__init__(f"Upstream returned {status}")
+        self.status = status
+        self.retry_after = retry_after
+        self.detail = detail
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class TokenBucket:
+    """Async token bucket allowing `rate` calls per second with bursts of `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return  # Unlimited
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class UpstreamLimiter:
+    """Rate limit, concurrency cap and retry policy for one upstream API"""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = 5.0,
+        burst: float = 10.0,
+        max_concurrency: int = 10,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0
+    ):
+        self.name = name
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._bucket = TokenBucket(rate, burst)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @classmethod
+    def from_env(cls, name: str, **defaults) -> 'UpstreamLimiter':
+        """Build a limiter from NAME_RATE_LIMIT, NAME_BURST, NAME_MAX_CONCURRENCY, ..."""
+        prefix = name.upper()
+        def setting(key, default, cast):
+            return cast(os.getenv(f"{prefix}_{key}", defaults.get(key.lower(), default)))
+
+        return cls(
+            name=name,
+            rate=setting('RATE_LIMIT', 5.0, float),
+            burst=setting('BURST', 10.0, float),
+            max_concurrency=setting('MAX_CONCURRENCY', 10, int),
+            max_retries=setting('MAX_RETRIES', 3, int),
+            backoff_base=setting('BACKOFF_BASE', 0.5, float),
+            backoff_max=setting('BACKOFF_MAX', 30.0, float)
+        )
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn under the rate limit, retrying RetryableStatus and connection errors"""
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                await self._bucket.acquire()
+                try:
+                    return await fn()
+                except RetryableStatus as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self._backoff(attempt, e.retry_after)
+                    print(f"{self.name} returned {e.status}, retrying in {delay:.2f}s")
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self._backoff(attempt, None)
+                    print(f"{self.name} request failed ({str(e) or type(e).__name__}), retrying in {delay:.2f}s")
+            # Sleep outside the semaphore so waiting retries don't hold a slot
+            await asyncio.sleep(delay)
+
+_limiters: Dict[str, UpstreamLimiter] = {}
+
+def get_limiter(name: str, **defaults) -> UpstreamLimiter:
+    """Shared limiter for an upstream, configured from the environment on first use"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = UpstreamLimiter.from_env(name, **defaults)
+        _limiters[name] = limiter
+    return limiter
@@ -0,0 +1,58 @@
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import time
+from .sqlite_cache import SQLiteCache
+
+WEB_SEARCH_CACHE_PATH = os.getenv('WEB_SEARCH_CACHE_PATH', 'database/web_search_cache.sqlite3')
+WEB_SEARCH_CACHE_TTL = float(os.getenv('WEB_SEARCH_CACHE_TTL', '86400'))
+WEB_SEARCH_CACHE_STALE_TTL = float(os.getenv('WEB_SEARCH_CACHE_STALE_TTL', '604800'))
+
+class SearchResultCache(SQLiteCache):
+    """SQLite cache of processed web search results keyed by search query.
+
+    Entries younger than ttl are fresh. Entries older than ttl but younger
+    than ttl + stale_ttl are still served, flagged as stale so the caller
+    can refresh them in the background.
+    """
+
+    def __init__(
+        self,
+        path: str = WEB_SEARCH_CACHE_PATH,
+        ttl: float = WEB_SEARCH_CACHE_TTL,
+        stale_ttl: float = WEB_SEARCH_CACHE_STALE_TTL
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        super().__init__(path, [
+            "CREATE TABLE IF NOT EXISTS search_results ("
+            "query TEXT PRIMARY KEY, results TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        ])
+
+    def get(self, query: str) -> Optional[Tuple[List[Dict], bool]]:
+        """Return (results, is_stale), or None if missing or too old to serve"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results, fetched_at FROM search_results WHERE query = ?", (query,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        age = time.time() - row[1]
+        if age > self.ttl + self.stale_ttl:
+            return None
+        return json.loads(row[0]), age > self.ttl
+
+    def set(self, query: str, results: List[Dict]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results (query, results, fetched_at) VALUES (?, ?, ?)",
+                (query, json.dumps(results), time.time())
+            )
+
+    def purge_expired(self) -> int:
+        """Delete entries too old to be served, returning how many were removed"""
+        cutoff = time.time() - (self.ttl + self.stale_ttl)
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM search_results WHERE fetched_at < ?", (cutoff,))
+        return cursor.rowcount
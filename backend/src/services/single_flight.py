@@ -0,0 +1,77 @@
+from typing import Awaitable, Callable, Dict, Hashable, List, TypeVar
+import asyncio
+
+T = TypeVar('T')
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one upstream call.
+
+    The shared work runs in its own task, so a caller that is cancelled
+    does not cancel the result other callers are waiting for.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await fn() once for every concurrent caller with the same key"""
+        async def run_one(keys: List[Hashable]) -> List[T]:
+            return [await fn()]
+
+        results = await self.do_many([key], run_one)
+        return results[0]
+
+    async def do_many(
+        self,
+        keys: List[Hashable],
+        fn: Callable[[List[Hashable]], Awaitable[List[T]]]
+    ) -> List[T]:
+        """Join flights already running for some keys and start one fn call for the rest.
+
+        fn receives the keys nobody else is computing and must return one
+        result per key, in the same order.
+        """
+        loop = asyncio.get_running_loop()
+        futures = {}
+        own = []
+        for key in dict.fromkeys(keys):
+            existing = self._inflight.get(key)
+            if existing is not None:
+                futures[key] = existing
+            else:
+                future = loop.create_future()
+                self._inflight[key] = future
+                futures[key] = future
+                own.append(key)
+
+        if own:
+            task = loop.create_task(fn(own))
+            task.add_done_callback(
+                lambda done: self._settle(own, [futures[key] for key in own], done)
+            )
+
+        return [await asyncio.shield(futures[key]) for key in keys]
+
+    def _settle(self, keys: List[Hashable], futures: List[asyncio.Future], task: asyncio.Task):
+        for key, future in zip(keys, futures):
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        if task.cancelled():
+            for future in futures:
+                future.cancel()
+            return
+
+        error = task.exception()
+        if error is None and len(task.result()) != len(futures):
+            error = RuntimeError("Single-flight call returned the wrong number of results")
+        for i, future in enumerate(futures):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(task.result()[i])
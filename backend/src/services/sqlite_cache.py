@@ -0,0 +1,28 @@
+from typing import List
+import os
+import sqlite3
+import threading
+
+class SQLiteCache:
+    """Base for caches kept in a SQLite file.
+
+    Holds one WAL-mode connection shared across threads behind a lock.
+    Queries block, so async callers should run them with asyncio.to_thread.
+    """
+
+    def __init__(self, path: str, schema: List[str]):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for statement in schema:
+                self._conn.execute(statement)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
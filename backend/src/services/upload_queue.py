@@ -0,0 +1,145 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from dataclasses import dataclass, field, fields, asdict
+from datetime import datetime
+import asyncio
+import json
+import os
+import uuid
+
+UPLOAD_JOBS_DIR = os.getenv('UPLOAD_JOBS_DIR', 'database/upload_jobs')
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '2'))
+
+@dataclass
+class UploadJob:
+    id: str
+    filename: str
+    status: str = "queued"  # queued, parsing, enhancing, completed, failed
+    total: int = 0
+    processed: int = 0
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    updated_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def update(self, **changes):
+        """Record progress on the job"""
+        for name, value in changes.items():
+            setattr(self, name, value)
+        self.updated_at = datetime.now().isoformat()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self, offset: int = 0) -> Dict[str, Any]:
+        """Progress and the results from offset onwards"""
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data["results"] = self.results[offset:]
+        data["offset"] = offset
+        return data
+
+UploadProcessor = Callable[[UploadJob], Awaitable[None]]
+UploadCleanup = Callable[[], None]
+
+class UploadJobQueue:
+    """Background worker pool for uploads, with finished jobs persisted to disk"""
+
+    def __init__(self, storage_dir: str = UPLOAD_JOBS_DIR, workers: int = UPLOAD_WORKERS):
+        self.storage_dir = storage_dir
+        self.workers = max(1, workers)
+        os.makedirs(storage_dir, exist_ok=True)
+        self._jobs: Dict[str, UploadJob] = {}
+        self._cleanups: Dict[str, UploadCleanup] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start the worker tasks (called on app startup)"""
+        if self._worker_tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def close(self):
+        """Stop the workers; unfinished jobs are marked failed"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for job in list(self._jobs.values()):
+            if not job.finished:
+                self._finish(job, "failed", "Server shut down before the upload finished")
+
+    async def submit(
+        self,
+        filename: str,
+        process: UploadProcessor,
+        cleanup: Optional[UploadCleanup] = None
+    ) -> UploadJob:
+        """Queue an upload and return its job immediately.
+
+        cleanup (e.g. deleting the uploaded file) runs once the job finishes,
+        including when it is still queued at shutdown and never processed.
+        """
+        await self.start()
+        job = UploadJob(id=str(uuid.uuid4()), filename=filename)
+        self._jobs[job.id] = job
+        if cleanup is not None:
+            self._cleanups[job.id] = cleanup
+        self._persist(job)
+        self._queue.put_nowait((job, process))
+        return job
+
+    def get(self, job_id: str) -> Optional[UploadJob]:
+        """Look up a running job, or a finished one from disk"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        path = self._job_path(job_id)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return UploadJob(**json.load(f))
+
+    async def _worker(self):
+        while True:
+            job, process = await self._queue.get()
+            try:
+                await process(job)
+                self._finish(job, "completed")
+            except asyncio.CancelledError:
+                self._finish(job, "failed", "Upload was cancelled")
+                raise
+            except Exception as e:
+                print(f"Error processing upload {job.id}: {str(e)}")
+                self._finish(job, "failed", str(e))
+            finally:
+                self._queue.task_done()
+
+    def _finish(self, job: UploadJob, status: str, error: Optional[str] = None):
+        job.update(status=status, error=error)
+        self._persist(job)
+        # Finished jobs are served from disk from now on
+        self._jobs.pop(job.id, None)
+        cleanup = self._cleanups.pop(job.id, None)
+        if cleanup is not None:
+            try:
+                cleanup()
+            except Exception as e:
+                print(f"Error cleaning up upload {job.id}: {str(e)}")
+
+    def _job_path(self, job_id: str) -> Optional[str]:
+        try:
+            uuid.UUID(job_id)
+        except ValueError:
+            return None
+        return os.path.join(self.storage_dir, f"{job_id}.json")
+
+    def _persist(self, job: UploadJob):
+        path = self._job_path(job.id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(asdict(job), f, default=str)
+        os.replace(tmp_path, path)
@@ -1,64 +1,199 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import aiohttp
 import asyncio
 from bs4 import BeautifulSoup
 import os
 from dotenv import load_dotenv
+from .search_cache import SearchResultCache
+from .single_flight import SingleFlight
+from .rate_limit import (
+    RETRYABLE_STATUSES,
+    RetryableStatus,
+    UpstreamLimiter,
+    get_limiter,
+    parse_retry_after
+)
 
 load_dotenv()
 
+SEARCH_URL = os.getenv('SERPER_URL', "https://google.serper.dev/search")
+CONNECTOR_LIMIT = int(os.getenv('WEB_SEARCH_CONNECTOR_LIMIT', '100'))
+CONNECTOR_LIMIT_PER_HOST = int(os.getenv('WEB_SEARCH_CONNECTOR_LIMIT_PER_HOST', '20'))
+KEEPALIVE_TIMEOUT = float(os.getenv('WEB_SEARCH_KEEPALIVE_TIMEOUT', '30'))
+REQUEST_TIMEOUT = float(os.getenv('WEB_SEARCH_TIMEOUT', '10'))
+CONNECT_TIMEOUT = float(os.getenv('WEB_SEARCH_CONNECT_TIMEOUT', '3'))
+
 class WebSearchService:
-    def __init__(self):
+    def __init__(
+        self,
+        search_url: Optional[str] = None,
+        connector_limit: int = CONNECTOR_LIMIT,
+        connector_limit_per_host: int = CONNECTOR_LIMIT_PER_HOST,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        request_timeout: float = REQUEST_TIMEOUT,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        cache: Optional[SearchResultCache] = None,
+        limiter: Optional[UpstreamLimiter] = None
+    ):
         self.search_api_key = os.getenv('SERPER_API_KEY')
-        self.search_url = "https://google.serper.dev/search"
+        self.search_url = search_url or SEARCH_URL
         self.headers = {
             'X-API-KEY': self.search_api_key,
             'Content-Type': 'application/json'
         }
 
+        # One pooled session is shared by every search
+        self.connector_limit = connector_limit
+        self.connector_limit_per_host = connector_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=request_timeout, connect=connect_timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # Persistent result cache with stale-while-revalidate refreshes
+        self.cache = cache if cache is not None else SearchResultCache()
+        self._refreshing = set()
+        self._refresh_tasks = set()
+        # Shared Serper rate limit, concurrency cap and retry policy
+        self.limiter = limiter or get_limiter('serper')
+        # Identical concurrent searches share one request
+        self._inflight = SingleFlight()
+
+    async def start(self):
+        """Open the pooled HTTP session (called on app startup)"""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.connector_limit,
+            limit_per_host=self.connector_limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers={k: v for k, v in self.headers.items() if v is not None},
+            timeout=self.timeout
+        )
+
+    async def close(self):
+        """Close the pooled HTTP session (called on app shutdown)"""
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Start lazily for callers outside the app lifecycle
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
     async def search_job_info(
         self,
         job_title: str,
         context: str = None
     ) -> List[Dict[str, str]]:
         """Search for job information on the web"""
+        results = await self.lookup_job_info(job_title, context)
+        return results if results is not None else []
+
+    async def lookup_job_info(
+        self,
+        job_title: str,
+        context: str = None
+    ) -> Optional[List[Dict[str, str]]]:
+        """Like search_job_info, but None when the search failed rather than found nothing"""
         search_query = f"{job_title} job description responsibilities requirements"
         if context:
             search_query += f" {context}"
 
-        async with aiohttp.ClientSession() as session:
+        # Serve cached results, refreshing stale ones in the background
+        # SQLite lookups block, so they run off the event loop
+        cached = await asyncio.to_thread(self.cache.get, search_query) if self.cache else None
+        if cached is not None:
+            results, is_stale = cached
+            if is_stale:
+                self._schedule_refresh(search_query, job_title)
+            return results
+
+        return await self._inflight.do(
+            search_query, lambda: self._fetch_and_cache(search_query, job_title)
+        )
+
+    async def _fetch_and_cache(self, search_query: str, job_title: str) -> Optional[List[Dict[str, str]]]:
+        results = await self._fetch(search_query, job_title)
+        if results is None:
+            return None
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, search_query, results)
+        return results
+
+    def _schedule_refresh(self, search_query: str, job_title: str):
+        """Refresh a stale cache entry without making the caller wait"""
+        if search_query in self._refreshing:
+            return
+        self._refreshing.add(search_query)
+        task = asyncio.create_task(self._refresh(search_query, job_title))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, search_query: str, job_title: str):
+        try:
+            results = await self._fetch(search_query, job_title)
+            if results is not None:
+                await asyncio.to_thread(self.cache.set, search_query, results)
+        except Exception as e:
+            print(f"Error refreshing web search for '{search_query}': {str(e)}")
+        finally:
+            self._refreshing.discard(search_query)
+
+    async def _fetch(self, search_query: str, job_title: str) -> Optional[List[Dict[str, str]]]:
+        """Query the search API, returning None if the request failed"""
+        async def request():
+            session = await self._get_session()
             async with session.post(
                 self.search_url,
-                headers=self.headers,
                 json={'q': search_query}
             ) as response:
+                if response.status in RETRYABLE_STATUSES:
+                    raise RetryableStatus(
+                        response.status, parse_retry_after(response.headers.get('Retry-After'))
+                    )
                 if response.status != 200:
-                    return []
-
-                data = await response.json()
-                results = []
-
-                # Process organic results
-                if 'organic' in data:
-                    for result in data['organic'][:5]:  # Limit to top 5 results
-                        title = result.get('title', '')
-                        link = result.get('link', '')
-                        snippet = result.get('snippet', '')
-
-                        # Extract relevant information from the snippet
-                        content = self._extract_relevant_info(snippet, job_title)
-                        
-                        if content:
-                            results.append({
-                                'title': title,
-                                'url': link,
-                                'content': content,
-                                'relevance': self._calculate_relevance(content, job_title)
-                            })
-
-                # Sort results by relevance
-                results.sort(key=lambda x: x['relevance'], reverse=True)
-                return results
+                    return None
+                return await response.json()
+
+        try:
+            data = await self.limiter.call(request)
+        except RetryableStatus as e:
+            print(f"Web search gave up after retries: {e.status}")
+            return None
+        if data is None:
+            return None
+
+        results = []
+
+        # Process organic results
+        if 'organic' in data:
+            for result in data['organic'][:5]:  # Limit to top 5 results
+                title = result.get('title', '')
+                link = result.get('link', '')
+                snippet = result.get('snippet', '')
+
+                # Extract relevant information from the snippet
+                content = self._extract_relevant_info(snippet, job_title)
+                
+                if content:
+                    results.append({
+                        'title': title,
+                        'url': link,
+                        'content': content,
+                        'relevance': self._calculate_relevance(content, job_title)
+                    })
+
+        # Sort results by relevance
+        results.sort(key=lambda x: x['relevance'], reverse=True)
+        return results
 
     def _extract_relevant_info(self, text: str, job_title: str) -> str:
         """Extract relevant information from text"""
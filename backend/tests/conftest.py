@@ -0,0 +1,29 @@
+import contextlib
+import os
+import sys
+
+import pytest
+from aiohttp import web
+
+# Import the app modules the way main.py does, as services.X and ai_agent.X
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (BACKEND_DIR, os.path.join(BACKEND_DIR, 'src')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+@pytest.fixture
+def stub_server():
+    """Serve a POST handler on a free local port; `async with stub_server(path, handler) as url`"""
+    @contextlib.asynccontextmanager
+    async def serve(path, handler):
+        app = web.Application()
+        app.router.add_post(path, handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, '127.0.0.1', 0).start()
+            host, port = runner.addresses[0][:2]
+            yield f'http://{host}:{port}{path}'
+        finally:
+            await runner.cleanup()
+    return serve
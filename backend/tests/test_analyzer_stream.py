@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from ai_agent.analyzer import AIWorkforceAnalyzer
+from services.completion_cache import CompletionCache
+from services.rate_limit import UpstreamLimiter
+
+ANALYSIS = {
+    "Impact Summary": {"summary": "Reporting is automated, {judgement} stays \"human\""},
+    "Recommendations": ["Pilot AI report drafting", "Review outputs weekly"],
+    "Risk Assessment": {"risks": "Over-reliance on generated figures"},
+    "Upskilling Opportunities": ["Prompt engineering"]
+}
+# Models often wrap the JSON in a code fence
+COMPLETION = "```json\n" + json.dumps(ANALYSIS) + "\n```"
+
+REQUEST = {
+    "team_name": "Finance",
+    "industry": "Banking",
+    "company_size": "Large",
+    "members": [{
+        "role": "Analyst",
+        "department": "Finance",
+        "experience_level": "Senior",
+        "responsibilities": ["Monthly reporting"]
+    }]
+}
+
+class StubChatCompletions:
+    """Local chat-completions endpoint that streams COMPLETION in small chunks"""
+
+    def __init__(self, statuses=None, chunk_size=8, delay=0.005):
+        self.statuses = list(statuses or [])
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        self.requests.append(await request.json())
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status != 200:
+            return web.json_response({"error": "stub"}, status=status, headers={"Retry-After": "0"})
+
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for start in range(0, len(COMPLETION), self.chunk_size):
+                event = {"choices": [{"delta": {"content": COMPLETION[start:start + self.chunk_size]}}]}
+                await response.write(f"data: {json.dumps(event)}\n\n".encode())
+                await asyncio.sleep(self.delay)
+            await response.write(b"data: [DONE]\n\n")
+            return response
+        finally:
+            self.active -= 1
+
+async def run_with_stub(stub_server, stub, tmp_path, scenario, max_concurrency=4):
+    async with stub_server("/v1/chat/completions", stub.handle) as url:
+        analyzer = AIWorkforceAnalyzer(
+            cache=CompletionCache(path=str(tmp_path / "completions.sqlite3")),
+            api_url=url,
+            limiter=UpstreamLimiter("stub", rate=0, max_concurrency=max_concurrency, max_retries=2)
+        )
+        try:
+            return await scenario(analyzer)
+        finally:
+            await analyzer.close()
+            analyzer.cache.close()
+
+async def collect(analyzer, request=REQUEST):
+    return [event async for event in analyzer.stream_team_analysis(request)]
+
+def test_streams_deltas_sections_and_result(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    stub = StubChatCompletions()
+
+    events = asyncio.run(run_with_stub(stub_server, stub, tmp_path, collect))
+
+    assert stub.requests[0]["stream"] is True
+    deltas = [data for event, data in events if event == "delta"]
+    assert len(deltas) > 1
+    assert "".join(deltas) == COMPLETION
+
+    sections = [data for event, data in events if event == "section"]
+    assert [section["name"] for section in sections] == [
+        "impact_summary", "recommendations", "risk_assessment", "upskilling_opportunities"
+    ]
+    assert sections[0]["value"] == ANALYSIS["Impact Summary"]
+
+    event, result = events[-1]
+    assert event == "result"
+    assert result["recommendations"] == ANALYSIS["Recommendations"]
+    assert result["team_name"] == "Finance"
+
+def test_completed_stream_is_replayed_from_cache(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    stub = StubChatCompletions()
+
+    async def scenario(analyzer):
+        await collect(analyzer)
+        return await collect(analyzer)
+
+    events = asyncio.run(run_with_stub(stub_server, stub, tmp_path, scenario))
+    assert len(stub.requests) == 1
+    assert [data for event, data in events if event == "delta"] == [COMPLETION]
+
+def test_retries_before_the_first_token(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    stub = StubChatCompletions(statuses=[429])
+
+    events = asyncio.run(run_with_stub(stub_server, stub, tmp_path, collect))
+    assert len(stub.requests) == 2
+    assert events[-1][1]["risk_assessment"] == ANALYSIS["Risk Assessment"]
+
+def test_concurrency_slot_is_held_until_the_stream_ends(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    stub = StubChatCompletions()
+
+    async def scenario(analyzer):
+        # A different industry gives a different prompt, so neither hits the cache
+        other = {**REQUEST, "industry": "Insurance"}
+        return await asyncio.gather(collect(analyzer), collect(analyzer, other))
+
+    first, second = asyncio.run(run_with_stub(stub_server, stub, tmp_path, scenario, max_concurrency=1))
+    assert len(stub.requests) == 2
+    assert stub.max_active == 1
+    assert first[-1][0] == second[-1][0] == "result"
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+from services.rate_limit import UpstreamLimiter
+from services.search_cache import SearchResultCache
+from services.web_search import WebSearchService
+
+ORGANIC = {'organic': [{
+    'title': 'Data Engineer',
+    'link': 'https://example.com/data-engineer',
+    'snippet': 'A data engineer role requires pipeline experience.'
+}]}
+
+class StubSerper:
+    """Local Serper stand-in that records requests and plays scripted responses"""
+
+    def __init__(self, responses=None, delay=0.0):
+        self.responses = list(responses or [])
+        self.delay = delay
+        self.requests = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests.append({
+            'api_key': request.headers.get('X-API-KEY'),
+            'peer': request.transport.get_extra_info('peername'),
+            'body': await request.json()
+        })
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        status, headers = self.responses.pop(0) if self.responses else (200, {})
+        if status != 200:
+            return web.json_response({'error': 'stub'}, status=status, headers=headers)
+        return web.json_response(ORGANIC)
+
+async def run_with_stub(stub_server, stub, tmp_path, scenario, **service_options):
+    async with stub_server('/search', stub.handle) as url:
+        service = WebSearchService(
+            search_url=url,
+            cache=SearchResultCache(path=str(tmp_path / 'cache.sqlite3')),
+            limiter=service_options.pop('limiter', UpstreamLimiter('stub', rate=0, max_retries=2)),
+            **service_options
+        )
+        try:
+            return await scenario(service)
+        finally:
+            await service.close()
+            service.cache.close()
+
+def test_reuses_one_pooled_session_and_sends_api_key(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setenv('SERPER_API_KEY', 'test-key')
+    stub = StubSerper()
+
+    async def scenario(service):
+        results = [await service.search_job_info('Role 0')]
+        session = service._session
+        for i in range(1, 3):
+            results.append(await service.search_job_info(f'Role {i}'))
+            assert service._session is session
+        return results
+
+    results = asyncio.run(run_with_stub(stub_server, stub, tmp_path, scenario))
+    assert all(r and r[0]['url'] == 'https://example.com/data-engineer' for r in results)
+    assert [r['api_key'] for r in stub.requests] == ['test-key'] * 3
+    # Every request went over the same kept-alive connection
+    assert len({r['peer'] for r in stub.requests}) == 1
+
+def test_timeout_is_retried_then_raised(stub_server, tmp_path):
+    stub = StubSerper(delay=0.5)
+
+    async def scenario(service):
+        with pytest.raises(asyncio.TimeoutError):
+            await service.search_job_info('Slow Role')
+
+    asyncio.run(run_with_stub(
+        stub_server, stub, tmp_path, scenario,
+        request_timeout=0.1,
+        limiter=UpstreamLimiter('stub', rate=0, max_retries=1, backoff_max=0.01)
+    ))
+    assert len(stub.requests) == 2
+
+def test_429_honours_retry_after(stub_server, tmp_path):
+    stub = StubSerper(responses=[(429, {'Retry-After': '0.3'}), (200, {})])
+
+    async def scenario(service):
+        start = time.monotonic()
+        results = await service.search_job_info('Busy Role')
+        return results, time.monotonic() - start
+
+    results, elapsed = asyncio.run(run_with_stub(stub_server, stub, tmp_path, scenario))
+    assert results
+    assert len(stub.requests) == 2
+    assert elapsed >= 0.3
+
+def test_failed_search_is_reported_and_not_cached(stub_server, tmp_path):
+    stub = StubSerper(responses=[(429, {'Retry-After': '0'})] * 3)
+
+    async def scenario(service):
+        assert await service.lookup_job_info('Down Role') is None
+        # Nothing was cached, so the next call asks again and gets results
+        assert await service.search_job_info('Down Role')
+
+    asyncio.run(run_with_stub(stub_server, stub, tmp_path, scenario))
+    assert len(stub.requests) == 4
+
+def test_concurrent_identical_searches_share_one_request(stub_server, tmp_path):
+    stub = StubSerper(delay=0.1)
+
+    async def scenario(service):
+        return await asyncio.gather(*(service.search_job_info('Popular Role') for _ in range(5)))
+
+    results = asyncio.run(run_with_stub(stub_server, stub, tmp_path, scenario))
+    assert len(stub.requests) == 1
+    assert all(r == results[0] for r in results)